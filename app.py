@@ -6,24 +6,29 @@ import importlib.util
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables from .env file FIRST
-# This ensures Azure storage credentials are available before any imports
 project_dir = Path(__file__).parent
-env_path = project_dir / ".env"
-if env_path.exists():
-    load_dotenv(env_path)
-else:
-    # Try loading from current directory as fallback
-    load_dotenv()
-
-# Suppress PyTorch warnings that cause issues with Streamlit
-warnings.filterwarnings("ignore", category=UserWarning)
-warnings.filterwarnings("ignore", category=FutureWarning)
-warnings.filterwarnings("ignore", category=DeprecationWarning)
-
-# Change working directory to project root to ensure relative paths work
-# (project_dir was already set above when loading .env)
-os.chdir(project_dir)
+
+# Streamlit re-executes this script on every interaction; the process-wide
+# setup below (env, warning filters, cwd) only needs to happen once.
+if not getattr(sys, "_app_bootstrapped", False):
+    # Load environment variables from .env file FIRST
+    # This ensures Azure storage credentials are available before any imports
+    env_path = project_dir / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+    else:
+        # Try loading from current directory as fallback
+        load_dotenv()
+
+    # Suppress PyTorch warnings that cause issues with Streamlit
+    warnings.filterwarnings("ignore", category=UserWarning)
+    warnings.filterwarnings("ignore", category=FutureWarning)
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    # Change working directory to project root to ensure relative paths work
+    os.chdir(project_dir)
+
+    sys._app_bootstrapped = True
 
 # Import utility functions from streamlit_app directory FIRST
 # Note: We need to handle two utils directories:
@@ -33,48 +38,50 @@ streamlit_app_dir = project_dir / "streamlit_app"
 streamlit_app_path = str(streamlit_app_dir)
 project_dir_path = str(project_dir)
 
-# CRITICAL: Remove project_dir from path if it exists, then add streamlit_app FIRST
-# This ensures utils.ui resolves to streamlit_app/utils/ui, not root utils/
-# We also need to remove any cached utils modules
-if project_dir_path in sys.path:
-    sys.path.remove(project_dir_path)
+def _load_module_from_file(module_name, file_path):
+    """Load a module straight from its file, bypassing the sys.path search"""
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
-# Remove cached utils modules that might have been loaded from root
-# This includes both 'utils' package and any 'utils.*' submodules
-modules_to_remove = [mod for mod in list(sys.modules.keys()) if mod == 'utils' or mod.startswith('utils.')]
-for mod in modules_to_remove:
-    del sys.modules[mod]
+@st.cache_resource(show_spinner=False)
+def _bootstrap_utils():
+    """
+    Set up sys.path and load the UI/page modules exactly once per process.
 
-# Ensure streamlit_app is at the very beginning of the path
-if streamlit_app_path in sys.path:
-    sys.path.remove(streamlit_app_path)
-sys.path.insert(0, streamlit_app_path)
+    Streamlit re-executes this script on every interaction, so the path fix-up
+    and the utils.* module purge must not run on each rerun.
+    """
+    # streamlit_app MUST come before project_dir so the lazy "utils.*" imports
+    # inside the page components resolve to streamlit_app/utils
+    modules_to_remove = [mod for mod in sys.modules if mod == 'utils' or mod.startswith('utils.')]
+    for mod in modules_to_remove:
+        del sys.modules[mod]
+    for path in (streamlit_app_path, project_dir_path):
+        if path in sys.path:
+            sys.path.remove(path)
+    sys.path[0:0] = [streamlit_app_path, project_dir_path]
 
-# Now add project_dir AFTER streamlit_app for other imports (generation, evaluator, etc.)
-sys.path.insert(1, project_dir_path)
+    styles = _load_module_from_file("utils_ui_styles", streamlit_app_dir / "utils" / "ui" / "styles.py")
+    components = _load_module_from_file("utils_pages_components", streamlit_app_dir / "utils" / "pages" / "components.py")
+    return {
+        "load_custom_css": styles.load_custom_css,
+        "show_home_page": components.show_home_page,
+        "show_question_generation_page": components.show_question_generation_page,
+        "show_answer_evaluation_page": components.show_answer_evaluation_page,
+        "show_manual_review_page": components.show_manual_review_page,
+    }
 
 try:
-    # Verify path order before importing
-    # streamlit_app MUST be first, before project_dir
-    if sys.path[0] != streamlit_app_path:
-        # Force streamlit_app to be first
-        if streamlit_app_path in sys.path:
-            sys.path.remove(streamlit_app_path)
-        sys.path.insert(0, streamlit_app_path)
-    
-    # Double-check that project_dir is not before streamlit_app
-    project_index = sys.path.index(project_dir_path) if project_dir_path in sys.path else -1
-    streamlit_index = sys.path.index(streamlit_app_path) if streamlit_app_path in sys.path else -1
-    if project_index >= 0 and project_index < streamlit_index:
-        # Remove project_dir and re-insert after streamlit_app
-        sys.path.remove(project_dir_path)
-        sys.path.insert(1, project_dir_path)
-    
-    # Now import - Python should find streamlit_app/utils/ui since streamlit_app is first
-    from utils.ui.styles import load_custom_css
-    from utils.pages.components import show_home_page, show_question_generation_page, show_answer_evaluation_page, show_manual_review_page
+    _utils = _bootstrap_utils()
+    load_custom_css = _utils["load_custom_css"]
+    show_home_page = _utils["show_home_page"]
+    show_question_generation_page = _utils["show_question_generation_page"]
+    show_answer_evaluation_page = _utils["show_answer_evaluation_page"]
+    show_manual_review_page = _utils["show_manual_review_page"]
     
-except (ImportError, AttributeError) as e:
+except (ImportError, AttributeError, FileNotFoundError) as e:
     st.error(f"Import error: {e}")
     st.error("Please ensure all dependencies are installed: pip install -r requirements.txt")
     st.error(f"Current working directory: {os.getcwd()}")
@@ -88,27 +95,8 @@ except (ImportError, AttributeError) as e:
         st.error(f"UI styles file path: {ui_path}")
     st.stop()
 
-# Import your existing modules with error handling
-try:
-    from generation.pipeline import run_pipeline_web
-    try:
-        from evaluator.answer_evaluator import evaluate_from_json_files
-    except ImportError as e:
-        st.warning(f"⚠️ Warning: Could not import answer_evaluator: {e}")
-        st.warning("Evaluation features may not work properly. Please check your dependencies.")
-        evaluate_from_json_files = None
-    
-    try:
-        from evaluator.report_generator import generate_full_report
-    except ImportError as e:
-        st.warning(f"⚠️ Warning: Could not import report_generator: {e}")
-        generate_full_report = None
-except ImportError as e:
-    st.error(f"Error importing modules: {e}")
-    st.error("Please ensure you're running from the correct directory and all dependencies are installed.")
-    import traceback
-    st.error(traceback.format_exc())
-    st.stop()
+# The pipeline and evaluator entry points are imported by the page components
+# that call them, so pages that don't use them never pay their import cost
 
 # Page configuration
 st.set_page_config(
@@ -118,22 +106,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Set dark theme
-st.markdown("""
-<style>
-    [data-testid="stAppViewContainer"] {
-        background-color: #0e1117;
-        color: #fafafa;
-    }
-    .stApp {
-        background-color: #0e1117;
-    }
-    .main {
-        background-color: #0e1117;
-    }
-</style>
-""", unsafe_allow_html=True)
-
 def main():
     # Load custom CSS
     load_custom_css()
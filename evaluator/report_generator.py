@@ -4,26 +4,76 @@ Generate human-readable feedback reports from evaluation_results.json
 """
 
 import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from docx import Document
-from docx.shared import Pt, Inches, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from collections import namedtuple
+from functools import cache, lru_cache
+from io import BytesIO
+from xml.sax.saxutils import escape
 
-def generate_question_feedback(q_num, result):
-    """Generate detailed feedback for a single question."""
-    question = result.get("question", "N/A")
-    student_answer = result.get("student_answer", "No answer provided")
-    expected_answer = result.get("expected_answer", "No reference answer")
-    percentage_score = result.get("percentage_score", 0)
+try:
+    import orjson  # Optional: much faster parsing of large results files
+except ImportError:
+    orjson = None
 
-    # Include image info if available
-    has_student_image = result.get("has_student_image", False)
-    has_reference_image = result.get("has_reference_image", False)
-    image_similarity = None
-    if "evaluation_details" in result:
-        image_similarity = result["evaluation_details"].get("image_similarity")
+# python-docx is imported only when a DOCX report is built, so the Markdown
+# and console paths (and Streamlit reruns importing this module) skip it
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W_NSDECL = f'xmlns:w="{_W_NS}"'
+_SECT_PR = f"{{{_W_NS}}}sectPr"
+
+_Fmt = namedtuple("_Fmt", "pt11 pt12 pt16 in1 grey green orange red")
+
+@cache
+def _fmt():
+    """Formatting values shared by every DOCX report, built on first use."""
+    from docx.shared import Pt, Inches, RGBColor
+    return _Fmt(
+        pt11=Pt(11),
+        pt12=Pt(12),
+        pt16=Pt(16),
+        in1=Inches(1),
+        grey=RGBColor(100, 100, 100),
+        green=RGBColor(0, 128, 0),
+        orange=RGBColor(255, 165, 0),
+        red=RGBColor(255, 0, 0),
+    )
+
+# Below this many students the process pool start-up costs more than it saves
+_PARALLEL_MIN_STUDENTS = 8
+
+# Workers are spawned, not forked: the report is built inside the threaded
+# Streamlit server, and forking a multi-threaded process can deadlock the child
+# on locks held by other threads. Each spawned worker re-imports python-docx
+# and this module (about 0.1s more than a fork), which the threshold above covers
+_POOL_CONTEXT = multiprocessing.get_context("spawn")
 
-    feedback = f"""
+@lru_cache(maxsize=8)
+def _read_results_cached(path, mtime_ns):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _load_results(results_or_path):
+    """
+    Return evaluation results, loading them from disk when given a path.
+
+    The file's bytes are cached on (path, mtime), so generating the Markdown
+    and DOCX reports from the same file reads it only once; each call parses
+    its own copy, so callers may modify the results freely.
+    """
+    if isinstance(results_or_path, dict):
+        return results_or_path
+    path = os.path.abspath(results_or_path)
+    data = _read_results_cached(path, os.stat(path).st_mtime_ns)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Markdown pieces for one question, interned once at import
+_QTMPL = """
 ## Question {q_num}
 **Question:** {question}
 
@@ -32,12 +82,33 @@ def generate_question_feedback(q_num, result):
 
 **Score:** {percentage_score}%
 """
+_IMG_TMPL = "**Image Provided:** Student: {student}, Reference: {reference}\n"
+_IMG_SIM_TMPL = "**Image Similarity:** {}\n"
+_Q_SEPARATOR = "\n---\n"
+
+def generate_question_feedback(q_num, result):
+    """Generate detailed feedback for a single question."""
+    get = result.get
+    parts = [_QTMPL.format(
+        q_num=q_num,
+        question=get("question", "N/A"),
+        student_answer=get("student_answer", "No answer provided"),
+        expected_answer=get("expected_answer", "No reference answer"),
+        percentage_score=get("percentage_score", 0),
+    )]
+
+    # Include image info if available
+    has_student_image = get("has_student_image", False)
+    has_reference_image = get("has_reference_image", False)
     if has_student_image or has_reference_image:
-        feedback += f"**Image Provided:** Student: {has_student_image}, Reference: {has_reference_image}\n"
-        if image_similarity is not None:
-            feedback += f"**Image Similarity:** {image_similarity}\n"
+        parts.append(_IMG_TMPL.format(student=has_student_image, reference=has_reference_image))
+        if "evaluation_details" in result:
+            image_similarity = result["evaluation_details"].get("image_similarity")
+            if image_similarity is not None:
+                parts.append(_IMG_SIM_TMPL.format(image_similarity))
+    parts.append(_Q_SEPARATOR)
 
-    return feedback + "\n---\n"
+    return "".join(parts)
 
 def generate_summary(results):
     """Print console summary based on individual_results and summary."""
@@ -74,39 +145,228 @@ def generate_summary(results):
     print(f"Overall: {overall}")
     print("=" * 50)
 
-def generate_full_report(results_json_path, output_path="feedback_report.md"):
-    """Generate full Markdown report for all questions."""
-    with open(results_json_path, 'r', encoding='utf-8') as f:
-        results = json.load(f)
+def generate_full_report(results_or_path, output_path="feedback_report.md"):
+    """Generate full Markdown report for all questions from a results dict or evaluation_results.json path."""
+    results = _load_results(results_or_path)
 
     individual_results = results.get("individual_results", {})
     summary = results.get("summary", {})
 
-    report = f"# Student Answer Evaluation Report\n"
-    report += f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-    report += f"## Overall Summary\n"
-    report += f"- Total Questions: {summary.get('total_questions', len(individual_results))}\n"
-    report += f"- Questions Answered: {summary.get('answered_questions', 0)}\n"
-    report += f"- Questions Evaluated: {summary.get('evaluated_questions', 0)}\n"
-    report += f"- Overall Average Score: {summary.get('overall_average', 0)}%\n"
-    report += f"- Total Achieved Score: {summary.get('total_achieved_score', 0)}\n"
-    report += f"- Total Possible Score: {summary.get('total_possible_score', 0)}\n\n"
-
-    report += "## Detailed Question Feedback\n"
+    # Stream the report to disk question by question instead of growing one string
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 16) as f:
+        f.write("# Student Answer Evaluation Report\n")
+        f.write(f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write("## Overall Summary\n")
+        f.write(f"- Total Questions: {summary.get('total_questions', len(individual_results))}\n")
+        f.write(f"- Questions Answered: {summary.get('answered_questions', 0)}\n")
+        f.write(f"- Questions Evaluated: {summary.get('evaluated_questions', 0)}\n")
+        f.write(f"- Overall Average Score: {summary.get('overall_average', 0)}%\n")
+        f.write(f"- Total Achieved Score: {summary.get('total_achieved_score', 0)}\n")
+        f.write(f"- Total Possible Score: {summary.get('total_possible_score', 0)}\n\n")
 
-    for q_num, res in individual_results.items():
-        report += generate_question_feedback(q_num, res)
+        f.write("## Detailed Question Feedback\n")
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(report)
+        for q_num, res in individual_results.items():
+            f.write(generate_question_feedback(q_num, res))
 
     print(f"\n📄 Detailed feedback report saved to: {output_path}")
     return results
 
-def generate_docx_report(results_json_path, output_path="evaluation_report.docx"):
-    """Generate a formatted DOCX report for all questions."""
-    with open(results_json_path, 'r', encoding='utf-8') as f:
-        results = json.load(f)
+# Summary tables have a fixed two-column shape, so they are emitted as one
+# XML fragment instead of being built and restyled cell by cell
+_SUMMARY_ROW_XML = (
+    '<w:tr>'
+    '<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+    '<w:p><w:r><w:rPr><w:b/><w:sz w:val="22"/></w:rPr><w:t xml:space="preserve">{label}</w:t></w:r></w:p></w:tc>'
+    '<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+    '<w:p><w:r><w:rPr><w:sz w:val="22"/></w:rPr><w:t xml:space="preserve">{value}</w:t></w:r></w:p></w:tc>'
+    '</w:tr>'
+)
+
+def _build_summary_rows(summary, n_questions):
+    """Label/value rows for the Overall Summary table."""
+    g = summary.get
+    average = g('overall_average', 0)
+    return (
+        ("Total Questions", str(g('total_questions', n_questions))),
+        ("Questions Answered", str(g('answered_questions', 0))),
+        ("Questions Evaluated", str(g('evaluated_questions', 0))),
+        ("Overall Average Score", f"{average}%"),
+        ("Total Achieved Score", str(g('total_achieved_score', 0))),
+        ("Total Possible Score", str(g('total_possible_score', 0))),
+        ("Overall Rating", get_overall_rating(average)),
+    )
+
+def _add_summary_table(doc, rows, style="Light Grid Accent 1"):
+    """Append a two-column label/value table (bold 11pt labels, 11pt values) to the document."""
+    from docx.oxml import parse_xml
+    section = doc.sections[-1]
+    width = (section.page_width - section.left_margin - section.right_margin) // 2 // 635  # EMU -> twips
+    style_id = doc.styles[style].style_id
+    row_xml = "".join(
+        _SUMMARY_ROW_XML.format(width=width, label=escape(label), value=escape(value))
+        for label, value in rows
+    )
+    tbl = parse_xml(
+        f'<w:tbl {_W_NSDECL}>'
+        f'<w:tblPr><w:tblStyle w:val="{style_id}"/><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+        f'<w:tblGrid><w:gridCol w:w="{width}"/><w:gridCol w:w="{width}"/></w:tblGrid>'
+        f'{row_xml}</w:tbl>'
+    )
+    doc.element.body._insert_tbl(tbl)
+    return tbl
+
+def _blabel(paragraph, text):
+    """Add a bold label run to the paragraph and return it."""
+    run = paragraph.add_run(text)
+    run.bold = True
+    return run
+
+_HR_BORDER_XML = (
+    f'<w:pBdr {_W_NSDECL}>'
+    '<w:bottom w:val="single" w:sz="6" w:space="1" w:color="auto"/>'
+    '</w:pBdr>'
+)
+
+def _space(paragraph, pt=None, before=False):
+    """Give a paragraph vertical breathing room (12pt by default) instead of adding a blank paragraph."""
+    if pt is None:
+        pt = _fmt().pt12
+    if before:
+        paragraph.paragraph_format.space_before = pt
+    else:
+        paragraph.paragraph_format.space_after = pt
+    return paragraph
+
+def _hr(doc):
+    """Add an empty paragraph with a bottom border, drawn as a horizontal rule."""
+    from docx.oxml import parse_xml
+    p = doc.add_paragraph()
+    p._p.get_or_add_pPr().append(parse_xml(_HR_BORDER_XML))
+    return p
+
+@dataclass(slots=True)
+class _QResult:
+    """One question's result, read out of the results JSON once for rendering."""
+    q_num: str
+    question: str
+    student_answer: str
+    expected_answer: str
+    percentage_score: float
+    has_student_image: bool
+    has_reference_image: bool
+    has_details: bool
+    image_similarity: float | None
+    semantic_score: float | None
+    bleu: float | None
+    rouge_l: float | None
+
+    @classmethod
+    def from_dict(cls, q_num, result):
+        get = result.get
+        details = get("evaluation_details") or {}
+        return cls(
+            q_num=q_num,
+            question=get("question", "N/A"),
+            student_answer=get("student_answer", "No answer provided"),
+            expected_answer=get("expected_answer", "No reference answer"),
+            percentage_score=get("percentage_score", 0),
+            has_student_image=get("has_student_image", False),
+            has_reference_image=get("has_reference_image", False),
+            has_details="evaluation_details" in result,
+            image_similarity=details.get("image_similarity"),
+            semantic_score=details.get("semantic_score"),
+            bleu=details.get("bleu"),
+            rouge_l=details.get("rouge_l"),
+        )
+
+# Label/value paragraphs are emitted as one XML fragment each; tabs and line
+# breaks become <w:tab/>/<w:br/> exactly as python-docx's run.text setter does
+_RUN_TEXT_SPECIALS = str.maketrans({
+    "\t": '</w:t><w:tab/><w:t xml:space="preserve">',
+    "\n": '</w:t><w:br/><w:t xml:space="preserve">',
+    "\r": '</w:t><w:br/><w:t xml:space="preserve">',
+})
+
+def _run_xml(text, rpr=""):
+    return (
+        f'<w:r>{rpr}<w:t xml:space="preserve">'
+        f'{escape(text).translate(_RUN_TEXT_SPECIALS)}</w:t></w:r>'
+    )
+
+def _kv_para(doc, label, value=None, color=None):
+    """Append a paragraph holding a bold label run and an optional (coloured) value run."""
+    from docx.oxml import parse_xml
+    runs = _run_xml(label, "<w:rPr><w:b/></w:rPr>")
+    if value is not None:
+        rpr = f'<w:rPr><w:color w:val="{color}"/></w:rPr>' if color is not None else ""
+        runs += _run_xml(str(value), rpr)
+    p = parse_xml(f"<w:p {_W_NSDECL}>{runs}</w:p>")
+    doc.element.body._insert_p(p)
+    return p
+
+def _render_question_block(doc, q):
+    """Render one question's feedback (answers, score, image info, metrics) into the document."""
+    fmt = _fmt()
+    percentage_score = q.percentage_score
+
+    # Question heading
+    doc.add_heading(f"Question {q.q_num}", level=3)
+    
+    _kv_para(doc, "Question: ", q.question)
+    _kv_para(doc, "Your Answer: ", q.student_answer)
+    _kv_para(doc, "Reference Answer: ", q.expected_answer)
+    
+    # Score, colour coded
+    if percentage_score >= 80:
+        score_color = fmt.green
+    elif percentage_score >= 60:
+        score_color = fmt.orange
+    else:
+        score_color = fmt.red
+    _kv_para(doc, "Score: ", f"{percentage_score}%", score_color)
+    
+    # Image info if available
+    if q.has_student_image or q.has_reference_image:
+        _kv_para(doc, "Image Provided: ", f"Student: {q.has_student_image}, Reference: {q.has_reference_image}")
+        
+        if q.image_similarity is not None:
+            _kv_para(doc, "Image Similarity: ", f"{q.image_similarity:.2f}")
+    
+    # Evaluation details if available
+    if q.has_details:
+        metrics = []
+        if q.semantic_score is not None:
+            metrics.append(f"Semantic Score: {q.semantic_score:.2f}")
+        if q.bleu is not None:
+            metrics.append(f"BLEU Score: {q.bleu:.2f}")
+        if q.rouge_l is not None:
+            metrics.append(f"ROUGE-L Score: {q.rouge_l:.2f}")
+        
+        _kv_para(doc, "Evaluation Metrics: ", " | ".join(metrics) if metrics else None)
+    
+    # Add separator line
+    _hr(doc)
+
+def _docx_bytes(doc):
+    """Serialize the document in memory, for callers that only need the bytes."""
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def generate_docx_report(results_or_path, output_path="evaluation_report.docx"):
+    """
+    Generate a formatted DOCX report for all questions from a results dict or evaluation_results.json path.
+
+    With output_path=None nothing is written to disk and the .docx bytes are
+    returned instead of the results.
+    """
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    fmt = _fmt()
+    results = _load_results(results_or_path)
 
     individual_results = results.get("individual_results", {})
     summary = results.get("summary", {})
@@ -117,10 +377,10 @@ def generate_docx_report(results_json_path, output_path="evaluation_report.docx"
     # Set page margins
     sections = doc.sections
     for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
+        section.top_margin = fmt.in1
+        section.bottom_margin = fmt.in1
+        section.left_margin = fmt.in1
+        section.right_margin = fmt.in1
     
     # Title
     title = doc.add_heading("Student Answer Evaluation Report", level=1)
@@ -130,128 +390,31 @@ def generate_docx_report(results_json_path, output_path="evaluation_report.docx"
     date_para = doc.add_paragraph()
     date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
     date_run = date_para.add_run(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    date_run.font.size = Pt(11)
-    date_run.font.color.rgb = RGBColor(100, 100, 100)
-    
-    doc.add_paragraph("")  # Blank line
+    date_run.font.size = fmt.pt11
+    date_run.font.color.rgb = fmt.grey
+    _space(date_para)
     
     # Overall Summary Section
     doc.add_heading("Overall Summary", level=2)
     
     # Create summary table
-    summary_table = doc.add_table(rows=7, cols=2)
-    summary_table.style = 'Light Grid Accent 1'
-    
-    summary_data = [
-        ("Total Questions", str(summary.get('total_questions', len(individual_results)))),
-        ("Questions Answered", str(summary.get('answered_questions', 0))),
-        ("Questions Evaluated", str(summary.get('evaluated_questions', 0))),
-        ("Overall Average Score", f"{summary.get('overall_average', 0)}%"),
-        ("Total Achieved Score", str(summary.get('total_achieved_score', 0))),
-        ("Total Possible Score", str(summary.get('total_possible_score', 0))),
-        ("Overall Rating", get_overall_rating(summary.get('overall_average', 0)))
-    ]
-    
-    for i, (label, value) in enumerate(summary_data):
-        summary_table.rows[i].cells[0].text = label
-        summary_table.rows[i].cells[1].text = value
-        
-        # Make label bold
-        for paragraph in summary_table.rows[i].cells[0].paragraphs:
-            for run in paragraph.runs:
-                run.bold = True
-                run.font.size = Pt(11)
-        
-        # Set value font
-        for paragraph in summary_table.rows[i].cells[1].paragraphs:
-            for run in paragraph.runs:
-                run.font.size = Pt(11)
+    _add_summary_table(doc, _build_summary_rows(summary, len(individual_results)))
     
-    doc.add_paragraph("")  # Blank line
-    
-    # Detailed Question Feedback Section
-    doc.add_heading("Detailed Question Feedback", level=2)
+    # Detailed Question Feedback Section, spaced off the table above
+    _space(doc.add_heading("Detailed Question Feedback", level=2), before=True)
     
     # Add each question
     for q_num, result in individual_results.items():
-        # Question heading
-        doc.add_heading(f"Question {q_num}", level=3)
-        
-        # Question text
-        p = doc.add_paragraph()
-        p.add_run("Question: ").bold = True
-        p.add_run(result.get("question", "N/A"))
-        
-        # Student Answer
-        p = doc.add_paragraph()
-        p.add_run("Your Answer: ").bold = True
-        student_answer = result.get("student_answer", "No answer provided")
-        p.add_run(student_answer)
-        
-        # Reference Answer
-        p = doc.add_paragraph()
-        p.add_run("Reference Answer: ").bold = True
-        expected_answer = result.get("expected_answer", "No reference answer")
-        p.add_run(expected_answer)
-        
-        # Score
-        p = doc.add_paragraph()
-        score_run = p.add_run("Score: ").bold = True
-        percentage_score = result.get("percentage_score", 0)
-        score_value = p.add_run(f"{percentage_score}%")
-        
-        # Color code the score
-        if percentage_score >= 80:
-            score_value.font.color.rgb = RGBColor(0, 128, 0)  # Green
-        elif percentage_score >= 60:
-            score_value.font.color.rgb = RGBColor(255, 165, 0)  # Orange
-        else:
-            score_value.font.color.rgb = RGBColor(255, 0, 0)  # Red
-        
-        # Image info if available
-        has_student_image = result.get("has_student_image", False)
-        has_reference_image = result.get("has_reference_image", False)
-        image_similarity = None
-        if "evaluation_details" in result:
-            image_similarity = result["evaluation_details"].get("image_similarity")
-        
-        if has_student_image or has_reference_image:
-            p = doc.add_paragraph()
-            p.add_run("Image Provided: ").bold = True
-            p.add_run(f"Student: {has_student_image}, Reference: {has_reference_image}")
-            
-            if image_similarity is not None:
-                p = doc.add_paragraph()
-                p.add_run("Image Similarity: ").bold = True
-                p.add_run(f"{image_similarity:.2f}")
-        
-        # Evaluation details if available
-        if "evaluation_details" in result:
-            details = result["evaluation_details"]
-            p = doc.add_paragraph()
-            p.add_run("Evaluation Metrics: ").bold = True
-            
-            metrics = []
-            if details.get("semantic_score") is not None:
-                metrics.append(f"Semantic Score: {details.get('semantic_score', 0):.2f}")
-            if details.get("bleu") is not None:
-                metrics.append(f"BLEU Score: {details.get('bleu', 0):.2f}")
-            if details.get("rouge_l") is not None:
-                metrics.append(f"ROUGE-L Score: {details.get('rouge_l', 0):.2f}")
-            
-            if metrics:
-                p.add_run(" | ".join(metrics))
-        
-        # Add separator line
-        doc.add_paragraph("─" * 50)
-        doc.add_paragraph("")  # Blank line
+        _render_question_block(doc, _QResult.from_dict(q_num, result))
     
     # Set default font
     style = doc.styles['Normal']
     style.font.name = 'Calibri'
-    style.font.size = Pt(11)
+    style.font.size = fmt.pt11
     
     # Save document
+    if output_path is None:
+        return _docx_bytes(doc)
     doc.save(output_path)
     print(f"\n📄 Detailed DOCX feedback report saved to: {output_path}")
     return results
@@ -269,18 +432,83 @@ def get_overall_rating(avg_score):
     else:
         return "Needs Improvement"
 
-def generate_multi_student_docx_report(all_results, output_path="evaluation_report_all_students.docx"):
-    """Generate a formatted DOCX report for multiple students in one document."""
+def _render_student_section(doc, student_idx, results):
+    """Add one student's heading, summary table and question feedback to the document."""
+    fmt = _fmt()
+    individual_results = results.get("individual_results", {})
+    summary = results.get("summary", {})
+    student_name = results.get("student_name", f"Student {student_idx}")
+
+    # Student heading
+    doc.add_heading(f"Student {student_idx}", level=1)
+
+    # Student name (from filename)
+    name_para = doc.add_paragraph()
+    name_label_run = _blabel(name_para, "Name: ")
+    name_label_run.font.size = fmt.pt12
+    name_value_run = name_para.add_run(student_name)
+    name_value_run.font.size = fmt.pt12
+    _space(name_para)
+
+    # Overall Summary Section for this student
+    doc.add_heading("Overall Summary", level=2)
+
+    # Create summary table
+    _add_summary_table(doc, _build_summary_rows(summary, len(individual_results)))
+
+    # Detailed Question Feedback Section, spaced off the table above
+    _space(doc.add_heading("Detailed Question Feedback", level=2), before=True)
+
+    # Add each question
+    for q_num, result in individual_results.items():
+        _render_question_block(doc, _QResult.from_dict(q_num, result))
+
+def _render_student_body(job):
+    """Render one student into a scratch document and return its body XML (process pool worker)."""
+    from docx import Document
+    fmt = _fmt()
+    student_idx, results = job
+    doc = Document()
+    for section in doc.sections:
+        section.left_margin = fmt.in1
+        section.right_margin = fmt.in1
+    _render_student_section(doc, student_idx, results)
+    return doc.element.body.xml
+
+def _append_body(doc, body_xml):
+    """Move the blocks of a rendered body into the document, ahead of its section properties."""
+    from docx.oxml import parse_xml
+    body = doc.element.body
+    sect_pr = body.sectPr
+    for child in list(parse_xml(body_xml)):
+        if child.tag == _SECT_PR:
+            continue
+        if sect_pr is not None:
+            sect_pr.addprevious(child)
+        else:
+            body.append(child)
+
+def generate_multi_student_docx_report(all_results, output_path="evaluation_report_all_students.docx", max_workers=None):
+    """Generate a formatted DOCX report for multiple students in one document.
+
+    Classes of ``_PARALLEL_MIN_STUDENTS`` or more are rendered one student per
+    worker process and spliced into the master document in order. With
+    output_path=None the .docx bytes are returned instead of being saved.
+    """
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    fmt = _fmt()
     # Create document
     doc = Document()
     
     # Set page margins
     sections = doc.sections
     for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
+        section.top_margin = fmt.in1
+        section.bottom_margin = fmt.in1
+        section.left_margin = fmt.in1
+        section.right_margin = fmt.in1
     
     # Title
     title = doc.add_heading("Student Answer Evaluation Report - All Students", level=1)
@@ -290,153 +518,39 @@ def generate_multi_student_docx_report(all_results, output_path="evaluation_repo
     date_para = doc.add_paragraph()
     date_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
     date_run = date_para.add_run(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    date_run.font.size = Pt(11)
-    date_run.font.color.rgb = RGBColor(100, 100, 100)
-    
-    doc.add_paragraph("")  # Blank line
-    
+    date_run.font.size = fmt.pt11
+    date_run.font.color.rgb = fmt.grey
+    _space(date_para)
+
+    # Student headings share the Heading 1 style, so size it once on the master
+    if all_results:
+        doc.styles['Heading 1'].font.size = fmt.pt16
+
     # Process each student
-    for student_idx, results in enumerate(all_results, start=1):
-        individual_results = results.get("individual_results", {})
-        summary = results.get("summary", {})
-        student_name = results.get("student_name", f"Student {student_idx}")
-        student_filename = results.get("student_filename", "Unknown")
-        
-        # Student heading
-        student_heading = doc.add_heading(f"Student {student_idx}", level=1)
-        student_heading.style.font.size = Pt(16)
-        
-        # Student name (from filename)
-        name_para = doc.add_paragraph()
-        name_label_run = name_para.add_run("Name: ")
-        name_label_run.bold = True
-        name_label_run.font.size = Pt(12)
-        name_value_run = name_para.add_run(student_name)
-        name_value_run.font.size = Pt(12)
-        
-        doc.add_paragraph("")  # Blank line
-        
-        # Overall Summary Section for this student
-        doc.add_heading("Overall Summary", level=2)
-        
-        # Create summary table
-        summary_table = doc.add_table(rows=7, cols=2)
-        summary_table.style = 'Light Grid Accent 1'
-        
-        summary_data = [
-            ("Total Questions", str(summary.get('total_questions', len(individual_results)))),
-            ("Questions Answered", str(summary.get('answered_questions', 0))),
-            ("Questions Evaluated", str(summary.get('evaluated_questions', 0))),
-            ("Overall Average Score", f"{summary.get('overall_average', 0)}%"),
-            ("Total Achieved Score", str(summary.get('total_achieved_score', 0))),
-            ("Total Possible Score", str(summary.get('total_possible_score', 0))),
-            ("Overall Rating", get_overall_rating(summary.get('overall_average', 0)))
-        ]
-        
-        for i, (label, value) in enumerate(summary_data):
-            summary_table.rows[i].cells[0].text = label
-            summary_table.rows[i].cells[1].text = value
-            
-            # Make label bold
-            for paragraph in summary_table.rows[i].cells[0].paragraphs:
-                for run in paragraph.runs:
-                    run.bold = True
-                    run.font.size = Pt(11)
-            
-            # Set value font
-            for paragraph in summary_table.rows[i].cells[1].paragraphs:
-                for run in paragraph.runs:
-                    run.font.size = Pt(11)
-        
-        doc.add_paragraph("")  # Blank line
-        
-        # Detailed Question Feedback Section
-        doc.add_heading("Detailed Question Feedback", level=2)
-        
-        # Add each question
-        for q_num, result in individual_results.items():
-            # Question heading
-            doc.add_heading(f"Question {q_num}", level=3)
-            
-            # Question text
-            p = doc.add_paragraph()
-            p.add_run("Question: ").bold = True
-            p.add_run(result.get("question", "N/A"))
-            
-            # Student Answer
-            p = doc.add_paragraph()
-            p.add_run("Your Answer: ").bold = True
-            student_answer = result.get("student_answer", "No answer provided")
-            p.add_run(student_answer)
-            
-            # Reference Answer
-            p = doc.add_paragraph()
-            p.add_run("Reference Answer: ").bold = True
-            expected_answer = result.get("expected_answer", "No reference answer")
-            p.add_run(expected_answer)
-            
-            # Score
-            p = doc.add_paragraph()
-            score_run = p.add_run("Score: ").bold = True
-            percentage_score = result.get("percentage_score", 0)
-            score_value = p.add_run(f"{percentage_score}%")
-            
-            # Color code the score
-            if percentage_score >= 80:
-                score_value.font.color.rgb = RGBColor(0, 128, 0)  # Green
-            elif percentage_score >= 60:
-                score_value.font.color.rgb = RGBColor(255, 165, 0)  # Orange
-            else:
-                score_value.font.color.rgb = RGBColor(255, 0, 0)  # Red
-            
-            # Image info if available
-            has_student_image = result.get("has_student_image", False)
-            has_reference_image = result.get("has_reference_image", False)
-            image_similarity = None
-            if "evaluation_details" in result:
-                image_similarity = result["evaluation_details"].get("image_similarity")
-            
-            if has_student_image or has_reference_image:
-                p = doc.add_paragraph()
-                p.add_run("Image Provided: ").bold = True
-                p.add_run(f"Student: {has_student_image}, Reference: {has_reference_image}")
-                
-                if image_similarity is not None:
-                    p = doc.add_paragraph()
-                    p.add_run("Image Similarity: ").bold = True
-                    p.add_run(f"{image_similarity:.2f}")
-            
-            # Evaluation details if available
-            if "evaluation_details" in result:
-                details = result["evaluation_details"]
-                p = doc.add_paragraph()
-                p.add_run("Evaluation Metrics: ").bold = True
-                
-                metrics = []
-                if details.get("semantic_score") is not None:
-                    metrics.append(f"Semantic Score: {details.get('semantic_score', 0):.2f}")
-                if details.get("bleu") is not None:
-                    metrics.append(f"BLEU Score: {details.get('bleu', 0):.2f}")
-                if details.get("rouge_l") is not None:
-                    metrics.append(f"ROUGE-L Score: {details.get('rouge_l', 0):.2f}")
-                
-                if metrics:
-                    p.add_run(" | ".join(metrics))
-            
-            # Add separator line
-            doc.add_paragraph("─" * 50)
-            doc.add_paragraph("")  # Blank line
-        
-        # Add page break between students (except for the last one)
-        if student_idx < len(all_results):
-            doc.add_page_break()
+    jobs = list(enumerate(all_results, start=1))
+    if len(jobs) >= _PARALLEL_MIN_STUDENTS and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=_POOL_CONTEXT) as executor:
+            bodies = executor.map(_render_student_body, jobs)
+            for student_idx, body_xml in enumerate(bodies, start=1):
+                _append_body(doc, body_xml)
+                # Add page break between students (except for the last one)
+                if student_idx < len(jobs):
+                    doc.add_page_break()
+    else:
+        for student_idx, results in jobs:
+            _render_student_section(doc, student_idx, results)
+            # Add page break between students (except for the last one)
+            if student_idx < len(jobs):
+                doc.add_page_break()
     
     # Set default font
     style = doc.styles['Normal']
     style.font.name = 'Calibri'
-    style.font.size = Pt(11)
+    style.font.size = fmt.pt11
     
     # Save document
+    if output_path is None:
+        return _docx_bytes(doc)
     doc.save(output_path)
     print(f"\n📄 Multi-student DOCX feedback report saved to: {output_path}")
     return all_results
@@ -453,6 +567,5 @@ if __name__ == "__main__":
     results = generate_full_report(args.results, args.output) if not args.summary_only else None
 
     if args.summary_only:
-        with open(args.results, 'r', encoding='utf-8') as f:
-            results = json.load(f)
+        results = _load_results(args.results)
     generate_summary(results)
@@ -1,19 +1,154 @@
 import os
 import json
+import hashlib
+import mmap
+from bisect import bisect_left, bisect_right
 import requests
+from requests.adapters import HTTPAdapter
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import numpy as np
 import cv2
 from dotenv import load_dotenv
+from .jsonio import load_json, dump_json
 
 # Load environment variables
 load_dotenv()
 
-def extract_json(input_image, azure_endpoint=None, azure_key=None, output_folder="../output"):
+# Pages may be extracted concurrently; they all share structured_output.json
+_OUTPUT_LOCK = threading.Lock()
+
+# One keep-alive session for all Azure calls, sized for the page worker pool
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_TIMEOUT = (3, 30)  # (connect, read) seconds
+
+# Poll quickly at first so fast results are not held back, then back off
+_POLL_INITIAL_DELAY = 0.25
+_POLL_MAX_DELAY = 2.0
+
+# The diagram size limits, paddings and question-label window in extract_json
+# were tuned on 500 DPI pages; they are scaled to the page's actual DPI
+_TUNED_DPI = 500
+
+# Diagram detection (morphology, contours) runs on the page downsampled to
+# roughly this resolution (by a whole factor, so 2 at 500 DPI and 1 at 300);
+# found boxes are scaled back up before cropping the full-size image
+_DETECT_DPI = 250
+
+# Directories already created by this process; pages skip the mkdir syscalls
+_ENSURED_DIRS = set()
+
+# Diagram crops are PNG-encoded on a few threads (the encoder releases the GIL);
+# zlib level 1 is several times faster than the default for a slightly larger file
+_SAVE_WORKERS = 4
+_PNG_COMPRESS_LEVEL = 1
+
+_AZURE_MODEL = "prebuilt-read"
+_AZURE_API_VERSION = "2024-11-30"
+
+# The analyze-result cache (output/.azure_cache) is pruned whenever a result is
+# added: entries unused for _CACHE_MAX_AGE seconds go, then the least recently
+# used beyond _CACHE_MAX_ENTRIES. Reading an entry marks it as used
+_CACHE_MAX_ENTRIES = 500
+_CACHE_MAX_AGE = 30 * 24 * 3600
+
+def _ensure_dir(path):
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+
+def _cache_path(output_folder, file_data):
+    """Where the analyze result for these image bytes (any buffer) is cached; keyed on content, model and API version."""
+    key = hashlib.sha256(file_data).hexdigest()
+    return os.path.join(output_folder, ".azure_cache", f"{key}_{_AZURE_MODEL}_{_AZURE_API_VERSION}.json")
+
+def _load_cached_result(cache_file):
+    try:
+        result = load_json(cache_file)
+        os.utime(cache_file)
+        return result
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _prune_cache(cache_dir):
+    """Delete stale and least recently used cache entries; see _CACHE_MAX_ENTRIES."""
+    try:
+        entries = sorted(
+            ((e.stat().st_mtime, e.path) for e in os.scandir(cache_dir) if e.name.endswith(".json")),
+            reverse=True,
+        )
+    except OSError:
+        return
+    cutoff = time.time() - _CACHE_MAX_AGE
+    for i, (mtime, path) in enumerate(entries):
+        if i >= _CACHE_MAX_ENTRIES or mtime < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # already removed by another page's prune
+
+def _store_cached_result(cache_file, result):
+    """Write the result next to its final name, then swap it in so readers never see a partial file."""
+    _ensure_dir(os.path.dirname(cache_file))
+    tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    dump_json(result, tmp_file, indent=False)
+    os.replace(tmp_file, cache_file)
+    _prune_cache(os.path.dirname(cache_file))
+
+def _line_boxes(polygons):
+    """
+    Integer (x1, y1, x2, y2) bounds of flat [x, y, x, y, ...] polygons, one
+    row per polygon, computed in a single NumPy pass.
+    """
+    width = max(len(p) + len(p) % 2 for p in polygons)
+    if any(len(p) != width for p in polygons):
+        # Pair a trailing x with the first y, then repeat the first point;
+        # neither moves a polygon's bounds
+        padded = []
+        for p in polygons:
+            p = list(p) + list(p[1:2]) * (len(p) % 2)
+            padded.append(p + p[:2] * ((width - len(p)) // 2))
+        polygons = padded
+    points = np.asarray(polygons, dtype=np.float64).reshape(len(polygons), -1, 2)
+    # astype truncates toward zero like int() did
+    return np.hstack((points.min(axis=1), points.max(axis=1))).astype(np.int32)
+
+def _save_diagram(cropped, filename):
+    if cropped.mode == 'RGBA': cropped = cropped.convert('RGB')
+    cropped.save(filename, "PNG", compress_level=_PNG_COMPRESS_LEVEL)
+
+def _submit(url, azure_key, file_data):
+    """Start an Azure analyze operation for the image bytes (or mapped file) and return its operation URL."""
+    headers = {"Ocp-Apim-Subscription-Key": azure_key, "Content-Type": "application/octet-stream"}
+    response = _SESSION.post(url, headers=headers, data=file_data, timeout=_TIMEOUT)
+    response.raise_for_status()
+    return response.headers["Operation-Location"]
+
+def _poll(operation_url, azure_key):
+    """Wait for an Azure analyze operation to succeed and return its result."""
+    headers = {"Ocp-Apim-Subscription-Key": azure_key}
+    delay = _POLL_INITIAL_DELAY
+    while True:
+        result = _SESSION.get(operation_url, headers=headers, timeout=_TIMEOUT).json()
+        if result.get("status") == "succeeded":
+            return result
+        time.sleep(delay)
+        delay = min(_POLL_MAX_DELAY, delay * 1.5)
+
+def extract_json(input_image, azure_endpoint=None, azure_key=None, output_folder="../output", upload_image=None, dpi=_TUNED_DPI):
     """
     Extract diagrams from a single image using Azure Document Intelligence.
     Returns a dictionary with text and diagram info.
+
+    upload_image, when given, is a smaller same-size rendition of input_image
+    (e.g. a JPEG) that is sent to Azure instead; diagrams are still cropped
+    from input_image.
+
+    dpi is the resolution input_image was rendered at, so diagram limits keep
+    the same physical size whatever the page resolution.
     """
     # Get Azure credentials from environment or parameters
     azure_endpoint = azure_endpoint or os.getenv("AZURE_AI_VISION_ENDPOINT")
@@ -22,24 +157,24 @@ def extract_json(input_image, azure_endpoint=None, azure_key=None, output_folder
     if not azure_endpoint or not azure_key:
         raise ValueError("Azure AI Vision credentials not found. Please set AZURE_AI_VISION_ENDPOINT and AZURE_AI_VISION_KEY in .env file or pass as parameters.")
     
-    os.makedirs(os.path.join(output_folder, "diagrams"), exist_ok=True)
+    _ensure_dir(os.path.join(output_folder, "diagrams"))
 
     print(f"[INFO] Extracting text positions from {input_image}...")
-    url = f"{azure_endpoint}/documentintelligence/documentModels/prebuilt-read:analyze?api-version=2024-11-30"
+    url = f"{azure_endpoint}/documentintelligence/documentModels/{_AZURE_MODEL}:analyze?api-version={_AZURE_API_VERSION}"
 
-    with open(input_image, "rb") as f:
-        file_data = f.read()
+    # The upload is memory-mapped rather than read into a bytes copy: it is hashed
+    # in place and requests streams it to the socket in blocks
+    with open(upload_image or input_image, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_data:
+        # Identical images (re-runs of the same document) reuse the earlier analysis
+        cache_file = _cache_path(output_folder, file_data)
+        result = _load_cached_result(cache_file)
+        operation_url = _submit(url, azure_key, file_data) if result is None else None
 
-    headers = {"Ocp-Apim-Subscription-Key": azure_key, "Content-Type": "application/octet-stream"}
-    response = requests.post(url, headers=headers, data=file_data)
-    response.raise_for_status()
-    operation_url = response.headers["Operation-Location"]
-
-    while True:
-        result = requests.get(operation_url, headers={"Ocp-Apim-Subscription-Key": azure_key}).json()
-        if result.get("status") == "succeeded":
-            break
-        time.sleep(2)
+    if result is None:
+        result = _poll(operation_url, azure_key)
+        _store_cached_result(cache_file, result)
+    else:
+        print(f"[INFO] Using cached Azure result for {input_image}")
 
     img = Image.open(input_image)
     img_cv = cv2.imread(input_image)
@@ -47,73 +182,111 @@ def extract_json(input_image, azure_endpoint=None, azure_key=None, output_folder
     img_width, img_height = img.size
 
     text_lines = []
-    all_text_regions = []
+    polygons = []
     for page in result["analyzeResult"].get("pages", []):
         for line in page.get("lines", []):
-            content = line.get("content", "")
             polygon = line.get("polygon", [])
             if len(polygon) >= 8:
-                xs = [polygon[i] for i in range(0, len(polygon), 2)]
-                ys = [polygon[i] for i in range(1, len(polygon), 2)]
-                box = {"text": content, "x1": int(min(xs)), "y1": int(min(ys)), "x2": int(max(xs)), "y2": int(max(ys))}
-                all_text_regions.append(box)
-                text_lines.append(content)
-
-    text_mask = np.ones(gray.shape, dtype=np.uint8) * 255
-    for text_box in all_text_regions:
-        padding = 15
-        x1 = max(0, text_box["x1"] - padding)
-        y1 = max(0, text_box["y1"] - padding)
-        x2 = min(img_width, text_box["x2"] + padding)
-        y2 = min(img_height, text_box["y2"] + padding)
-        text_mask[y1:y2, x1:x2] = 0
-
-    _, binary = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
-    non_text_ink = cv2.bitwise_and(binary, text_mask)
-    kernel = np.ones((3, 3), np.uint8)
-    closed = cv2.morphologyEx(non_text_ink, cv2.MORPH_CLOSE, kernel, iterations=2)
-    dilated = cv2.dilate(closed, kernel, iterations=1)
+                text_lines.append(line.get("content", ""))
+                polygons.append(polygon)
+
+    # Text line boxes as parallel arrays, row i belonging to text_lines[i]
+    if polygons:
+        x1s, y1s, x2s, y2s = np.ascontiguousarray(_line_boxes(polygons).T)
+    else:
+        x1s = y1s = x2s = y2s = np.empty(0, dtype=np.int32)
+
+    # Pixels per pixel-at-500-DPI, for the tuned lengths (areas scale by its square)
+    px = dpi / _TUNED_DPI
+    scale = max(1, round(dpi / _DETECT_DPI))
+    small_width, small_height = max(1, img_width // scale), max(1, img_height // scale)
+    small = cv2.resize(gray, (small_width, small_height), interpolation=cv2.INTER_AREA)
+
+    if text_lines:
+        # Pad, downscale (floor starts, ceil ends) and clip every text box at once,
+        # then paint them white on the page so the threshold below drops their ink
+        padding = round(15 * px)
+        mask_x1s = np.clip((x1s - padding) // scale, 0, small_width)
+        mask_y1s = np.clip((y1s - padding) // scale, 0, small_height)
+        mask_x2s = np.clip(-(-(x2s + padding) // scale), 0, small_width)
+        mask_y2s = np.clip(-(-(y2s + padding) // scale), 0, small_height)
+        for x1, y1, x2, y2 in zip(mask_x1s.tolist(), mask_y1s.tolist(), mask_x2s.tolist(), mask_y2s.tolist()):
+            if x2 > x1 and y2 > y1:
+                # cv2.rectangle is inclusive of the far corner, the box is not
+                cv2.rectangle(small, (x1, y1), (x2 - 1, y2 - 1), 255, thickness=-1)
+
+    # 1 where there is ink outside text; 0/1 feeds both the morphology and the integral image
+    _, non_text_ink = cv2.threshold(small, 240, 1, cv2.THRESH_BINARY_INV)
+    # Two 3x3 closings equal one 5x5 closing; the dilation reuses its output buffer
+    dilated = cv2.morphologyEx(non_text_ink, cv2.MORPH_CLOSE, np.ones((5, 5), np.uint8))
+    cv2.dilate(dilated, np.ones((3, 3), np.uint8), dst=dilated)
 
     contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     diagrams = []
 
-    MIN_AREA = 2000; MAX_AREA = 100000; MIN_DENSITY = 0.03; MAX_DENSITY = 0.6
-    MIN_WIDTH = 80; MIN_HEIGHT = 80; MAX_WIDTH = 500; MAX_HEIGHT = 400
-
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        if MIN_AREA < area < MAX_AREA:
-            x, y, w, h = cv2.boundingRect(contour)
-            if w < MIN_WIDTH or h < MIN_HEIGHT or w > MAX_WIDTH or h > MAX_HEIGHT: continue
-            aspect_ratio = min(w, h) / max(w, h) if max(w, h) > 0 else 0
-            if aspect_ratio < 0.2: continue
-            roi = non_text_ink[y:y+h, x:x+w]
-            if roi.size > 0:
-                density = np.sum(roi > 0) / roi.size
-                if MIN_DENSITY < density < MAX_DENSITY:
-                    diagram_y_center = y + h // 2
-                    closest_q = "Unknown"; min_distance = float('inf')
-                    for text_box in all_text_regions:
-                        text = text_box["text"].strip()
-                        if text.startswith("Q"):
-                            q_y = text_box["y1"]
-                            distance = abs(diagram_y_center - q_y)
-                            if 0 < (diagram_y_center - q_y) < 400 and distance < min_distance:
-                                min_distance = distance
-                                closest_q = text
-                    padding = 20
-                    x1 = max(0, x - padding); y1 = max(0, y - padding)
-                    x2 = min(img_width, x + w + padding); y2 = min(img_height, y + h + padding)
-                    cropped = img.crop((x1, y1, x2, y2))
-                    filename = os.path.join(output_folder, "diagrams", f"diagram_{len(diagrams)+1}_{closest_q.replace('.', '').replace(' ', '_')}.png")
-                    if cropped.mode == 'RGBA': cropped = cropped.convert('RGB')
-                    cropped.save(filename)
-                    diagrams.append({"filename": filename, "coordinates": (x1, y1, x2, y2), "question": closest_q, "area": int(area), "density": round(density,3), "dimensions": f"{w}x{h}", "aspect_ratio": round(aspect_ratio,2)})
-                    print(f"[DIAGRAM] Diagram {len(diagrams)}: {filename} | Question: {closest_q}")
+    # Question labels ordered by top edge (stable, so ties keep reading order)
+    q_idx = np.array([i for i, text in enumerate(text_lines) if text.strip().startswith("Q")], dtype=np.intp)
+    q_idx = q_idx[np.argsort(y1s[q_idx], kind="stable")]
+    q_ys = y1s[q_idx].tolist()
+    q_labels = [text_lines[i].strip() for i in q_idx.tolist()]
+
+    # Ink pixel counts for any rectangle in O(1): four lookups into the integral image
+    ink_integral = cv2.integral(non_text_ink)
+
+    MIN_AREA = 2000 * px * px; MAX_AREA = 100000 * px * px; MIN_DENSITY = 0.03; MAX_DENSITY = 0.6
+    MIN_WIDTH = 80 * px; MIN_HEIGHT = 80 * px; MAX_WIDTH = 500 * px; MAX_HEIGHT = 400 * px
+    label_window = round(400 * px)
+
+    # Size, shape and ink density are tested for every contour at once from its
+    # bounding box; only the few survivors pay for contourArea in Python
+    rects = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int64).reshape(-1, 4)
+    bxs, bys, bws, bhs = rects.T
+    ws, hs = bws * scale, bhs * scale
+    longest = np.maximum(ws, hs)
+    aspects = np.divide(np.minimum(ws, hs), longest, out=np.zeros(len(rects)), where=longest > 0)
+    inks = (ink_integral[bys + bhs, bxs + bws] - ink_integral[bys, bxs + bws]
+            - ink_integral[bys + bhs, bxs] + ink_integral[bys, bxs])
+    densities = inks / np.maximum(bws * bhs, 1)
+    keep = ((ws >= MIN_WIDTH) & (hs >= MIN_HEIGHT) & (ws <= MAX_WIDTH) & (hs <= MAX_HEIGHT)
+            & (aspects >= 0.2) & (densities > MIN_DENSITY) & (densities < MAX_DENSITY))
+
+    # Pages are extracted concurrently and the diagram counter restarts on each
+    # one, so crop names carry the page image's name to stay unique
+    page_stem = os.path.splitext(os.path.basename(input_image))[0]
+    save_pool = ThreadPoolExecutor(max_workers=_SAVE_WORKERS)
+    saves = []
+    for i in np.flatnonzero(keep).tolist():
+        area = cv2.contourArea(contours[i]) * scale * scale
+        if not MIN_AREA < area < MAX_AREA: continue
+        sx, sy, sw, sh = rects[i].tolist()
+        x, y, w, h = sx * scale, sy * scale, sw * scale, sh * scale
+        aspect_ratio = float(aspects[i])
+        density = densities[i]
+
+        diagram_y_center = y + h // 2
+        # Nearest question label starting less than 400px (at 500 DPI) above the diagram centre
+        closest_q = "Unknown"
+        lo = bisect_right(q_ys, diagram_y_center - label_window)
+        hi = bisect_left(q_ys, diagram_y_center)
+        if lo < hi:
+            closest_q = q_labels[bisect_left(q_ys, q_ys[hi - 1], lo, hi)]
+        padding = round(20 * px)
+        x1 = max(0, x - padding); y1 = max(0, y - padding)
+        x2 = min(img_width, x + w + padding); y2 = min(img_height, y + h + padding)
+        cropped = img.crop((x1, y1, x2, y2))
+        filename = os.path.join(output_folder, "diagrams", f"diagram_{page_stem}_{len(diagrams)+1}_{closest_q.replace('.', '').replace(' ', '_')}.png")
+        saves.append(save_pool.submit(_save_diagram, cropped, filename))
+        diagrams.append({"filename": filename, "coordinates": (x1, y1, x2, y2), "question": closest_q, "area": int(area), "density": round(density,3), "dimensions": f"{w}x{h}", "aspect_ratio": round(aspect_ratio,2)})
+        print(f"[DIAGRAM] Diagram {len(diagrams)}: {filename} | Question: {closest_q}")
+
+    # Every diagram file is on disk (or its error raised) before the JSON lists it
+    save_pool.shutdown(wait=True)
+    for save in saves:
+        save.result()
 
     output_data = {"text": "\n".join(text_lines), "text_line_count": len(text_lines), "diagrams": diagrams, "total_diagrams": len(diagrams)}
-    with open(os.path.join(output_folder, "structured_output.json"), "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    with _OUTPUT_LOCK:
+        dump_json(output_data, os.path.join(output_folder, "structured_output.json"))
 
     print(f"\n[SUCCESS] Extraction complete! Text lines: {len(text_lines)}, Diagrams: {len(diagrams)}")
     return output_data
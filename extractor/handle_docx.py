@@ -1,46 +1,126 @@
 import os
 import re
-import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from docx import Document
-from docx.oxml.ns import qn
+from lxml import etree
+from .jsonio import dump_json
 
-def extract_images_from_cell(cell, doc, qid, questions):
+# Embedded image relationship ids, found by libxml2 in one pass instead of
+# walking every element in Python
+_NS = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+}
+_CELL_BLIP_IDS = etree.XPath(".//a:blip/@r:embed", namespaces=_NS)
+_RUN_BLIP_IDS = etree.XPath("./w:r//a:blip/@r:embed", namespaces=_NS)
+
+# Regex to match labels like: Q1, Q1:, Q1., Q1- (case-insensitive)
+_QUESTION_PATTERN = re.compile(r"^\s*Q\s*(\d+)\s*[:.)-]?\s*$", re.IGNORECASE)
+
+# Regex patterns for the Answer:/Keywords:/Diagram: format
+_ANSWER_PATTERN = re.compile(r"^\s*Answer:\s*(.+)$", re.IGNORECASE)
+_KEYWORDS_PATTERN = re.compile(r"^\s*Keywords:\s*(.+)$", re.IGNORECASE)
+_DIAGRAM_PATTERN = re.compile(r"^\s*Diagram:\s*$", re.IGNORECASE)
+
+# Diagrams are written under <project root>/output/diagrams
+_DIAGRAMS_DIR = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..")), "output", "diagrams"
+)
+# Directories already created by this process; cells and paragraphs skip the mkdir syscalls
+_ENSURED_DIRS = set()
+
+
+def _ensure_dir(path):
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+
+
+class _ImageWriter:
+    """
+    Writes each distinct embedded image of one document once, on a small
+    thread pool. A part referenced again (the same figure reused) resolves
+    to the file written the first time.
+    """
+
+    def __init__(self, max_workers=4):
+        self._json_paths = {}  # image partname -> JSON path of its file
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._writes = {}  # JSON path -> future of its file write
+        self._strict = set()  # JSON paths whose failed write aborts the extraction
+
+    def save(self, image_part, diagrams_dir, file_name, strict=True):
+        """
+        Queue the image for writing (first time only) and return its JSON path.
+        Without strict, a failed write is only warned about in close().
+        """
+        json_path = self._json_paths.get(image_part.partname)
+        if json_path is None:
+            image_filename_fs = os.path.join(diagrams_dir, file_name)
+            # Store a project-root relative path in JSON
+            json_path = os.path.join("./output/diagrams", file_name)
+            self._writes[json_path] = self._executor.submit(Path(image_filename_fs).write_bytes, image_part.blob)
+            self._json_paths[image_part.partname] = json_path
+        if strict:
+            self._strict.add(json_path)
+        return json_path
+
+    def close(self, questions):
+        """
+        Wait for all queued writes. A failed strict write (table cell images)
+        is re-raised; other failures (paragraph images) are warned about and
+        their paths dropped from the questions' diagram lists, as when the
+        images were written in place.
+        """
+        self._executor.shutdown(wait=True)
+        failed = set()
+        for json_path, future in self._writes.items():
+            error = future.exception()
+            if error is None:
+                continue
+            if json_path in self._strict:
+                raise error
+            print(f"Warning: Could not extract image from paragraph: {error}")
+            failed.add(json_path)
+        if failed:
+            for question in questions.values():
+                if question.get("diagram"):
+                    question["diagram"] = [path for path in question["diagram"] if path not in failed]
+
+
+def extract_images_from_cell(cell, doc, qid, questions, writer=None):
     """
     Extract all inline images from a docx table cell and save them.
     Updates questions[q_num]["diagram"] with image paths.
     """
-    # Resolve filesystem and JSON-visible paths for diagrams
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    diagrams_dir = os.path.join(base_dir, "output", "diagrams")
-    os.makedirs(diagrams_dir, exist_ok=True)
-
-    for drawing in cell._tc.iterchildren():  # iterate over direct child elements
-        for elem in drawing.iter():          # iterate recursively
-            if elem.tag.endswith('}blip'):
-                rId = elem.get(qn('r:embed'))
-                if not rId:
-                    continue
-                image_part = doc.part.related_parts[rId]
+    _ensure_dir(_DIAGRAMS_DIR)
 
-                image_index = len(questions[qid]["diagram"]) + 1
-                file_name = f"{qid}_diagram_{image_index}.png"
-                image_filename_fs = os.path.join(diagrams_dir, file_name)
-                with open(image_filename_fs, "wb") as f:
-                    f.write(image_part.blob)
-                # Store a project-root relative path in JSON
-                image_json_path = os.path.join("./output/diagrams", file_name)
-                questions[qid]["diagram"].append(image_json_path)
+    own_writer = writer is None
+    if own_writer:
+        writer = _ImageWriter()
+
+    try:
+        for rId in _CELL_BLIP_IDS(cell._tc):
+            if not rId:
+                continue
+            image_part = doc.part.related_parts[rId]
 
+            image_index = len(questions[qid]["diagram"]) + 1
+            file_name = f"{qid}_diagram_{image_index}.png"
+            questions[qid]["diagram"].append(writer.save(image_part, _DIAGRAMS_DIR, file_name))
+    finally:
+        if own_writer:
+            writer.close(questions)
 
-def extract_images_from_paragraph(paragraph, doc, qid, questions):
+
+def extract_images_from_paragraph(paragraph, doc, qid, questions, writer=None):
     """
     Extract all inline images from a docx paragraph and save them.
     Updates questions[qid]["diagram"] with image paths.
     """
-    # Resolve filesystem and JSON-visible paths for diagrams
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    diagrams_dir = os.path.join(base_dir, "output", "diagrams")
-    os.makedirs(diagrams_dir, exist_ok=True)
+    _ensure_dir(_DIAGRAMS_DIR)
 
     # Initialize diagram list if it doesn't exist
     if qid not in questions:
@@ -49,212 +129,207 @@ def extract_images_from_paragraph(paragraph, doc, qid, questions):
     if "diagram" not in questions[qid]:
         questions[qid]["diagram"] = []
 
-    # Look for images in the paragraph's runs
-    for run in paragraph.runs:
-        for drawing in run._element.iter():
-            if drawing.tag.endswith('}blip'):
-                rId = drawing.get(qn('r:embed'))
-                if not rId:
-                    continue
-                try:
-                    image_part = doc.part.related_parts[rId]
-
-                    image_index = len(questions[qid]["diagram"]) + 1
-                    file_name = f"{qid}_diagram_{image_index}.png"
-                    image_filename_fs = os.path.join(diagrams_dir, file_name)
-                    with open(image_filename_fs, "wb") as f:
-                        f.write(image_part.blob)
-                    # Store a project-root relative path in JSON
-                    image_json_path = os.path.join("./output/diagrams", file_name)
-                    questions[qid]["diagram"].append(image_json_path)
-                except Exception as e:
-                    print(f"Warning: Could not extract image from paragraph: {e}")
-                    continue
+    own_writer = writer is None
+    if own_writer:
+        writer = _ImageWriter()
+
+    try:
+        # Look for images in the paragraph's runs
+        for rId in _RUN_BLIP_IDS(paragraph._p):
+            if not rId:
+                continue
+            try:
+                image_part = doc.part.related_parts[rId]
+
+                image_index = len(questions[qid]["diagram"]) + 1
+                file_name = f"{qid}_diagram_{image_index}.png"
+                questions[qid]["diagram"].append(writer.save(image_part, _DIAGRAMS_DIR, file_name, strict=False))
+            except Exception as e:
+                print(f"Warning: Could not extract image from paragraph: {e}")
+                continue
+    finally:
+        if own_writer:
+            writer.close(questions)
 
 
 def extract_from_docx_table(docx_file, output_file="../output/final_answer.json"):
     # Ensure output directories exist
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    out_dir = os.path.join(base_dir, "output")
-    os.makedirs(os.path.join(out_dir, "diagrams"), exist_ok=True)
-    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    _ensure_dir(_DIAGRAMS_DIR)
+    _ensure_dir(os.path.dirname(os.path.abspath(output_file)))
 
     doc = Document(docx_file)
     questions = {}
+    # Image files are written in the background; all writes finish before the JSON is saved
+    writer = _ImageWriter()
 
-    # Regex to match labels like: Q1, Q1:, Q1., Q1- (case-insensitive)
-    question_pattern = re.compile(r"^\s*Q\s*(\d+)\s*[:.)-]?\s*$", re.IGNORECASE)
-    
-    # Regex patterns for the new format
-    answer_pattern = re.compile(r"^\s*Answer:\s*(.+)$", re.IGNORECASE)
-    keywords_pattern = re.compile(r"^\s*Keywords:\s*(.+)$", re.IGNORECASE)
-    diagram_pattern = re.compile(r"^\s*Diagram:\s*$", re.IGNORECASE)
-
-    # Process paragraphs instead of tables for the new format
-    current_question = None
-    current_answer = ""
-    current_keywords = ""
-    in_diagram_section = False
+    try:
+        # Process paragraphs instead of tables for the new format
+        current_question = None
+        current_answer = ""
+        current_keywords = ""
+        in_diagram_section = False
     
     
-    # Try both paragraph-based and table-based extraction
-    # First, try table-based extraction (original method)
-    if len(doc.tables) > 0:
-        for table in doc.tables:
-            for row in table.rows:
-                # Handle both single-column and multi-column formats
-                if len(row.cells) == 1:
-                    # Single column format - parse the content
-                    cell_text = row.cells[0].text.strip()
-                    if not cell_text:
-                        continue
+        # Try both paragraph-based and table-based extraction
+        # First, try table-based extraction (original method)
+        if len(doc.tables) > 0:
+            for table in doc.tables:
+                for row in table.rows:
+                    # Handle both single-column and multi-column formats
+                    if len(row.cells) == 1:
+                        # Single column format - parse the content
+                        cell_text = row.cells[0].text.strip()
+                        if not cell_text:
+                            continue
                     
-                    # Split by newlines to get individual components
-                    lines = cell_text.split('\n')
-                    current_qid = None
-                    current_answer = ""
-                    current_keywords = ""
-                    in_diagram_section = False
+                        # Split by newlines to get individual components
+                        lines = cell_text.split('\n')
+                        current_qid = None
+                        current_answer = ""
+                        current_keywords = ""
+                        in_diagram_section = False
                     
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
+                        for line in lines:
+                            line = line.strip()
+                            if not line:
+                                continue
                             
-                        # Check if this is a question number
-                        match = question_pattern.match(line)
-                        if match:
-                            # Save previous question if exists
-                            if current_qid:
-                                questions[current_qid] = {
-                                    "text": current_answer.strip(),
-                                    "keywords": current_keywords.strip(),
-                                    "diagram": []
-                                }
+                            # Check if this is a question number
+                            match = _QUESTION_PATTERN.match(line)
+                            if match:
+                                # Save previous question if exists
+                                if current_qid:
+                                    questions[current_qid] = {
+                                        "text": current_answer.strip(),
+                                        "keywords": current_keywords.strip(),
+                                        "diagram": []
+                                    }
                             
-                            # Start new question
-                            q_num = match.group(1)
-                            current_qid = f"Q{q_num}"
-                            current_answer = ""
-                            current_keywords = ""
-                            in_diagram_section = False
-                            continue
+                                # Start new question
+                                q_num = match.group(1)
+                                current_qid = f"Q{q_num}"
+                                current_answer = ""
+                                current_keywords = ""
+                                in_diagram_section = False
+                                continue
                         
-                        # Check for Answer: label
-                        answer_match = answer_pattern.match(line)
-                        if answer_match and current_qid:
-                            current_answer = answer_match.group(1)
-                            in_diagram_section = False
-                            continue
+                            # Check for Answer: label
+                            answer_match = _ANSWER_PATTERN.match(line)
+                            if answer_match and current_qid:
+                                current_answer = answer_match.group(1)
+                                in_diagram_section = False
+                                continue
                             
-                        # Check for Keywords: label
-                        keywords_match = keywords_pattern.match(line)
-                        if keywords_match and current_qid:
-                            current_keywords = keywords_match.group(1)
-                            in_diagram_section = False
-                            continue
+                            # Check for Keywords: label
+                            keywords_match = _KEYWORDS_PATTERN.match(line)
+                            if keywords_match and current_qid:
+                                current_keywords = keywords_match.group(1)
+                                in_diagram_section = False
+                                continue
                             
-                        # Check for Diagram: label
-                        if diagram_pattern.match(line) and current_qid:
-                            in_diagram_section = True
-                            continue
+                            # Check for Diagram: label
+                            if _DIAGRAM_PATTERN.match(line) and current_qid:
+                                in_diagram_section = True
+                                continue
                     
-                    # Save the last question
-                    if current_qid:
-                        questions[current_qid] = {
-                            "text": current_answer.strip(),
-                            "keywords": current_keywords.strip(),
-                            "diagram": []
-                        }
+                        # Save the last question
+                        if current_qid:
+                            questions[current_qid] = {
+                                "text": current_answer.strip(),
+                                "keywords": current_keywords.strip(),
+                                "diagram": []
+                            }
                         
-                        # Extract images from the cell
-                        extract_images_from_cell(row.cells[0], doc, current_qid, questions)
+                            # Extract images from the cell
+                            extract_images_from_cell(row.cells[0], doc, current_qid, questions, writer)
                 
-                elif len(row.cells) >= 2:
-                    # Multi-column format (original method)
-                    q_cell = row.cells[0].text.strip()  # First column: Q1, Q2...
-                    a_cell = row.cells[1].text.strip()  # Second column: answer text
+                    elif len(row.cells) >= 2:
+                        # Multi-column format (original method)
+                        q_cell = row.cells[0].text.strip()  # First column: Q1, Q2...
+                        a_cell = row.cells[1].text.strip()  # Second column: answer text
 
-                    if not q_cell:
-                        continue
+                        if not q_cell:
+                            continue
 
-                    match = question_pattern.match(q_cell)
-                    if not match:
-                        continue
+                        match = _QUESTION_PATTERN.match(q_cell)
+                        if not match:
+                            continue
 
-                    q_num = match.group(1)
-                    qid = f"Q{q_num}"
-                    question_text = a_cell
+                        q_num = match.group(1)
+                        qid = f"Q{q_num}"
+                        question_text = a_cell
 
-                    questions[qid] = {"text": question_text, "keywords": "", "diagram": []}
+                        questions[qid] = {"text": question_text, "keywords": "", "diagram": []}
 
-                    # Extract images from the answer column
-                    extract_images_from_cell(row.cells[1], doc, qid, questions)
+                        # Extract images from the answer column
+                        extract_images_from_cell(row.cells[1], doc, qid, questions, writer)
     
-    # If no questions found in tables, try paragraph-based extraction
-    if not questions:
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
+        # If no questions found in tables, try paragraph-based extraction
+        if not questions:
+            for paragraph in doc.paragraphs:
+                text = paragraph.text.strip()
             
-            if not text:
-                continue
+                if not text:
+                    continue
             
-            # Check if this is a question number
-            match = question_pattern.match(text)
-            if match:
-                # Save previous question if exists
-                if current_question:
-                    questions[current_question] = {
-                        "text": current_answer.strip(),
-                        "keywords": current_keywords.strip(),
-                        "diagram": []
-                    }
+                # Check if this is a question number
+                match = _QUESTION_PATTERN.match(text)
+                if match:
+                    # Save previous question if exists
+                    if current_question:
+                        questions[current_question] = {
+                            "text": current_answer.strip(),
+                            "keywords": current_keywords.strip(),
+                            "diagram": []
+                        }
                 
-                # Start new question
-                q_num = match.group(1)
-                current_question = f"Q{q_num}"
-                current_answer = ""
-                current_keywords = ""
-                in_diagram_section = False
-                continue
+                    # Start new question
+                    q_num = match.group(1)
+                    current_question = f"Q{q_num}"
+                    current_answer = ""
+                    current_keywords = ""
+                    in_diagram_section = False
+                    continue
             
-            # Check for Answer: label
-            answer_match = answer_pattern.match(text)
-            if answer_match and current_question:
-                current_answer = answer_match.group(1)
-                in_diagram_section = False
-                continue
+                # Check for Answer: label
+                answer_match = _ANSWER_PATTERN.match(text)
+                if answer_match and current_question:
+                    current_answer = answer_match.group(1)
+                    in_diagram_section = False
+                    continue
                 
-            # Check for Keywords: label
-            keywords_match = keywords_pattern.match(text)
-            if keywords_match and current_question:
-                current_keywords = keywords_match.group(1)
-                in_diagram_section = False
-                continue
+                # Check for Keywords: label
+                keywords_match = _KEYWORDS_PATTERN.match(text)
+                if keywords_match and current_question:
+                    current_keywords = keywords_match.group(1)
+                    in_diagram_section = False
+                    continue
                 
-            # Check for Diagram: label
-            if diagram_pattern.match(text) and current_question:
-                in_diagram_section = True
-                continue
+                # Check for Diagram: label
+                if _DIAGRAM_PATTERN.match(text) and current_question:
+                    in_diagram_section = True
+                    continue
                 
-            # If we're in a diagram section, look for images in this paragraph
-            if in_diagram_section and current_question:
-                # Extract images from this paragraph
-                extract_images_from_paragraph(paragraph, doc, current_question, questions)
-                continue
+                # If we're in a diagram section, look for images in this paragraph
+                if in_diagram_section and current_question:
+                    # Extract images from this paragraph
+                    extract_images_from_paragraph(paragraph, doc, current_question, questions, writer)
+                    continue
                 
-            # If we have a current question and this text doesn't match any pattern,
-            # it might be continuation of the answer
-            if current_question and not in_diagram_section and current_answer:
-                current_answer += " " + text
-
-    # Save the last question
-    if current_question:
-        questions[current_question] = {
-            "text": current_answer.strip(),
-            "keywords": current_keywords.strip(),
-            "diagram": []
-        }
+                # If we have a current question and this text doesn't match any pattern,
+                # it might be continuation of the answer
+                if current_question and not in_diagram_section and current_answer:
+                    current_answer += " " + text
+
+        # Save the last question
+        if current_question:
+            questions[current_question] = {
+                "text": current_answer.strip(),
+                "keywords": current_keywords.strip(),
+                "diagram": []
+            }
+    finally:
+        writer.close(questions)
 
     # Clean diagram entries
     for qid, content in questions.items():
@@ -264,8 +339,7 @@ def extract_from_docx_table(docx_file, output_file="../output/final_answer.json"
             content["diagram"] = content["diagram"][0]
 
     # Save JSON
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(questions, f, indent=2, ensure_ascii=False)
+    dump_json(questions, output_file)
 
     # Avoid Unicode emojis to prevent Windows cp1252 console errors
     print(f"Extracted typed answers + images from {docx_file}")
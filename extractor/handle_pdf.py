@@ -1,36 +1,77 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pdf2image import convert_from_path
 from PIL import Image, ImageFilter
 
-def convert_pdf_to_images(input_file, output_folder="../output/pages", poppler_path=None, dpi=500, sharpen=True):
+# Crisps thin PDF lines; the blur-based unsharp mask runs on Pillow's (and
+# Pillow-SIMD's) vectorised path, and the threshold leaves flat paper alone
+_SHARPEN = ImageFilter.UnsharpMask(radius=1, percent=120, threshold=3)
+
+def upload_copy_path(page_file):
+    """Path of the compact JPEG copy of a page meant for the Azure upload."""
+    return os.path.splitext(page_file)[0] + ".jpg"
+
+def azure_upload_path(page_file):
+    """The page's JPEG upload copy when one was saved, otherwise the page image itself."""
+    jpeg_file = upload_copy_path(page_file)
+    return jpeg_file if os.path.exists(jpeg_file) else page_file
+
+def _finish_page(img, filename, sharpen, azure_jpeg):
+    """Normalize a page image, write its JPEG upload copy and save it as PNG."""
+    # Convert mode if needed
+    if img.mode not in ["RGB", "L"]:
+        img = img.convert("RGB")
+
+    # Compact upload copy; taken before sharpening, which rings under JPEG
+    if azure_jpeg:
+        img.save(upload_copy_path(filename), "JPEG", quality=92)
+
+    # Optional sharpening for thin PDF lines
+    if sharpen:
+        img = img.filter(_SHARPEN)
+
+    # Save as high-quality PNG
+    img.save(filename, "PNG", quality=100)
+
+def _finish_rendered_page(filename, sharpen, azure_jpeg):
+    img = Image.open(filename)
+    img.load()  # Reads the pixels and releases the file so it can be overwritten
+    _finish_page(img, filename, sharpen, azure_jpeg)
+
+def convert_pdf_to_images(input_file, output_folder="../output/pages", poppler_path=None, dpi=300, sharpen=True, azure_jpeg=True):
     """
     Convert PDF pages to high-quality images.
     Returns a list of saved image file paths.
+
+    With azure_jpeg, an unsharpened JPEG copy of each page is saved next to
+    the PNG for the OCR upload (see azure_upload_path); the PNG stays the
+    source for diagram crops.
+
+    PDF pages get fresh uuid-prefixed names on every call, so output_folder
+    is the caller's to clean up; extractor.parse renders into a temporary
+    folder removed after extraction.
     """
     os.makedirs(output_folder, exist_ok=True)
-    saved_files = []
 
     if input_file.lower().endswith(".pdf"):
         print(f"Converting PDF '{input_file}' to images with DPI={dpi}...")
-        images = convert_from_path(input_file, dpi=dpi, poppler_path=poppler_path)
+        # Poppler renders straight to PNG files on its own threads, so pages
+        # never pile up in memory; post-processing then runs a page per thread
+        saved_files = convert_from_path(
+            input_file, dpi=dpi, poppler_path=poppler_path,
+            output_folder=output_folder, fmt="png", paths_only=True,
+            thread_count=os.cpu_count() or 1
+        )
+        if sharpen or azure_jpeg:
+            with ThreadPoolExecutor() as executor:
+                list(executor.map(lambda f: _finish_rendered_page(f, sharpen, azure_jpeg), saved_files))
     else:
         print(f"Loading single image '{input_file}'...")
-        images = [Image.open(input_file)]
-
-    for page_idx, img in enumerate(images, start=1):
-        filename = os.path.join(output_folder, f"page_{page_idx}.png")
-
-        # Convert mode if needed
-        if img.mode not in ["RGB", "L"]:
-            img = img.convert("RGB")
-
-        # Optional sharpening for thin PDF lines
-        if sharpen:
-            img = img.filter(ImageFilter.SHARPEN)
+        filename = os.path.join(output_folder, "page_1.png")
+        _finish_page(Image.open(input_file), filename, sharpen, azure_jpeg)
+        saved_files = [filename]
 
-        # Save as high-quality PNG
-        img.save(filename, "PNG", quality=100)
-        saved_files.append(filename)
+    for page_idx, filename in enumerate(saved_files, start=1):
         print(f"Saved page {page_idx} as {filename}")
 
     print(f"\n[SUCCESS] Conversion complete! Total pages/images saved: {len(saved_files)}")
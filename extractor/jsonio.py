@@ -0,0 +1,33 @@
+"""JSON file helpers for the extractor; uses orjson when installed, stdlib json otherwise"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Numpy scalars (e.g. diagram ink density) are written like stdlib json writes floats
+    _OPT = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    _OPT_INDENT = _OPT | orjson.OPT_INDENT_2
+
+def load_json(path):
+    """Read and parse a UTF-8 JSON file."""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def dump_json(data, path, indent=True):
+    """Write data as UTF-8 JSON (2-space indented unless indent is False)."""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=_OPT_INDENT if indent else _OPT))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        if indent:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        else:
+            json.dump(data, f, ensure_ascii=False)
@@ -1,10 +1,12 @@
 import os
 import sys
-import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from .handle_pdf import convert_pdf_to_images
+from .handle_pdf import convert_pdf_to_images, azure_upload_path
 from .extract import extract_json
 from .structure import convert_to_final_format
+from .jsonio import dump_json
 from .handle_docx import extract_from_docx_table  # import your DOCX handler
 
 # Load environment variables
@@ -28,6 +30,8 @@ elif platform.system() == "Windows":
 else:
     POPPLER_PATH = None  # Linux/Mac - Poppler should be in PATH
 OUTPUT_FOLDER = "./output"
+# PDF pages are rendered at this resolution; extract_json scales its diagram limits to it
+PDF_DPI = 300
 
 # Check if custom output folder is provided via environment variable
 if os.getenv("CUSTOM_OUTPUT_FOLDER"):
@@ -60,28 +64,47 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 structured_json_files = []
 
 if INPUT_FILE.lower().endswith(".pdf"):
-    # Convert PDF pages to images
-    image_files = convert_pdf_to_images(
-        INPUT_FILE, 
-        output_folder=os.path.join(OUTPUT_FOLDER, "pages"), 
-        poppler_path=POPPLER_PATH
-    )
-
-    # Extract JSON from each image using Azure
-    for idx, img_path in enumerate(image_files, start=1):
-        data = extract_json(img_path, AZURE_ENDPOINT, AZURE_KEY, output_folder=OUTPUT_FOLDER)
-        page_json_file = os.path.join(OUTPUT_FOLDER, f"structured_output_page_{idx}.json")
+    # The page images are only needed while they are extracted, so each run
+    # renders them into its own temporary folder, removed afterwards
+    with tempfile.TemporaryDirectory(prefix="pages_") as pages_folder:
+        # Convert PDF pages to images
+        image_files = convert_pdf_to_images(
+            INPUT_FILE, 
+            output_folder=pages_folder, 
+            poppler_path=POPPLER_PATH,
+            dpi=PDF_DPI
+        )
+
+        # Shared setup done once, before the page workers start
+        os.makedirs(os.path.join(OUTPUT_FOLDER, "diagrams"), exist_ok=True)
+        if _storage_available:
+            get_storage_client()
+
+        def extract_page(idx, img_path):
+            """Extract one page with Azure and save its JSON; runs in a worker thread."""
+            data = extract_json(
+                img_path, AZURE_ENDPOINT, AZURE_KEY, output_folder=OUTPUT_FOLDER,
+                upload_image=azure_upload_path(img_path), dpi=PDF_DPI
+            )
+            page_json_file = os.path.join(OUTPUT_FOLDER, f"structured_output_page_{idx}.json")
         
-        # Save to storage (blob or local)
-        if _storage_available and not should_use_temp_local(page_json_file):
-            storage = get_storage_client()
-            storage.write_json(page_json_file, data)
-        else:
-            # Local file system fallback
-            os.makedirs(os.path.dirname(page_json_file), exist_ok=True)
-            with open(page_json_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        structured_json_files.append(page_json_file)
+            # Save to storage (blob or local)
+            if _storage_available and not should_use_temp_local(page_json_file):
+                storage = get_storage_client()
+                storage.write_json(page_json_file, data)
+            else:
+                # Local file system fallback
+                dump_json(data, page_json_file)
+            return page_json_file
+
+        # Extract JSON from all pages concurrently; Azure OCR is network-bound
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(image_files)))) as executor:
+            futures = [
+                executor.submit(extract_page, idx, img_path)
+                for idx, img_path in enumerate(image_files, start=1)
+            ]
+            # Collected in submission order so pages stay in page order
+            structured_json_files.extend(future.result() for future in futures)
 
 elif INPUT_FILE.lower().endswith(".docx"):
     # Directly extract typed answers + diagrams from DOCX
@@ -96,8 +119,7 @@ elif INPUT_FILE.lower().endswith(".docx"):
     else:
         # Local file system fallback
         os.makedirs(os.path.dirname(final_output_file), exist_ok=True)
-        with open(final_output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        dump_json(data, final_output_file)
     print(f"Final structured JSON saved to {final_output_file}")
     sys.exit(0)
 
@@ -113,8 +135,7 @@ elif INPUT_FILE.lower().endswith((".png", ".jpg", ".jpeg")):
     else:
         # Local file system fallback
         os.makedirs(os.path.dirname(image_json_file), exist_ok=True)
-        with open(image_json_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        dump_json(data, image_json_file)
     structured_json_files.append(image_json_file)
 
 else:
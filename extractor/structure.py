@@ -1,6 +1,7 @@
-import json
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
+from .jsonio import load_json, dump_json
 
 # Import storage client for persistent file operations
 try:
@@ -9,6 +10,39 @@ try:
 except ImportError:
     _storage_available = False
 
+# Question labels like "Q3." (captured so re.split keeps them) and whitespace runs
+_Q_PATTERN = re.compile(r'(Q\d+\.)')
+_WS = re.compile(r"\s+")
+# Line breaks and tabs inside a question's text become plain spaces
+_TBL = str.maketrans({c: " " for c in "\n\r\t\f\v"})
+
+def _read_page(file):
+    """Read one page JSON file (supports both local and blob)."""
+    if _storage_available and not should_use_temp_local(file):
+        storage = get_storage_client()
+        if storage.is_blob_storage() and not os.path.exists(file):
+            # Try blob storage if file doesn't exist locally
+            return storage.read_json(file)
+        # Local file exists
+        return load_json(file)
+    # Local file system
+    return load_json(file)
+
+def _parse_one(file):
+    """
+    Read one page and split its text into (question label, cleaned text)
+    pairs in reading order. Returns the pairs and the page's diagrams.
+    """
+    data = _read_page(file)
+    parts = _Q_PATTERN.split(data.get('text', ''))
+    # re.split with a capture group alternates: [before, label, text, label, text, ...]
+    pairs = [
+        # Clean text: remove \n, tabs, extra spaces
+        (parts[i].strip(), parts[i + 1].strip().translate(_TBL))
+        for i in range(1, len(parts), 2)
+    ]
+    return pairs, data.get('diagrams', [])
+
 def convert_to_final_format(input_json_files, output_file):
     """
     Combine one or more structured_output.json files and produce a final JSON
@@ -16,43 +50,20 @@ def convert_to_final_format(input_json_files, output_file):
     """
     questions = {}
 
-    # Merge all pages
-    for file in input_json_files:
-        # Read JSON file (supports both local and blob)
-        if _storage_available and not should_use_temp_local(file):
-            storage = get_storage_client()
-            if storage.is_blob_storage() and not os.path.exists(file):
-                # Try blob storage if file doesn't exist locally
-                data = storage.read_json(file)
-            else:
-                # Local file exists
-                with open(file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-        else:
-            # Local file system
-            with open(file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        
-        text = data.get('text', '')
-        diagrams = data.get('diagrams', [])
-        question_pattern = r'(Q\d+\.)'
-        parts = re.split(question_pattern, text)
-        current_q = None
+    # Pages are read and split concurrently, then merged in page order
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(input_json_files)))) as executor:
+        pages = list(executor.map(_parse_one, input_json_files))
 
-        for part in parts:
-            if re.match(question_pattern, part):
-                current_q = part.strip()
-                if current_q not in questions:
-                    questions[current_q] = {"text": "", "diagram": None}
-            elif current_q:
-                # Clean text: remove \n, tabs, extra spaces
-                clean_text = part.strip().replace("\n", " ").replace("\t", " ")
-                questions[current_q]["text"] += clean_text + " "
+    for pairs, diagrams in pages:
+        for q_label, clean_text in pairs:
+            if q_label not in questions:
+                questions[q_label] = {"text": "", "diagram": None}
+            questions[q_label]["text"] += clean_text + " "
 
         # Associate diagrams with questions
         for diagram in diagrams:
             question_key = diagram.get('question', '')
-            match = re.match(question_pattern, question_key)
+            match = _Q_PATTERN.match(question_key)
             if match:
                 q_num = match.group(1)
                 if q_num in questions:
@@ -65,7 +76,7 @@ def convert_to_final_format(input_json_files, output_file):
 
     # Final cleanup: remove multiple spaces in text
     for q_num, content in questions.items():
-        content["text"] = re.sub(r"\s+", " ", content["text"]).strip()
+        content["text"] = _WS.sub(" ", content["text"]).strip()
 
     # Save final JSON (supports both local and blob)
     if _storage_available and not should_use_temp_local(output_file):
@@ -74,8 +85,7 @@ def convert_to_final_format(input_json_files, output_file):
     else:
         # Local file system fallback
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(questions, f, indent=2, ensure_ascii=False)
+        dump_json(questions, output_file)
 
     print(f"[SUCCESS] Final JSON saved: {output_file}")
     return questions
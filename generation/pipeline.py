@@ -1,34 +1,233 @@
+import copy
+import gzip
 import json
-import time
 import os
-from pathlib import Path
-from .utils.pdf_extractor import extract_topics as extract_topics_pdf
-from .utils.docx_extractor import extract_topics as extract_topics_docx, extract_topics_with_images
-from .utils.keyword_extractor import KeywordExtractor
-from .question_generation.question_generator import QuestionGenerator
-from .utils.manual_review import review_questions
-from .question_generation.context_generator import ContentGenerator
-from .utils.image_associator import ImageAssociator
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.table import Table
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-from docx.enum.table import WD_TABLE_ALIGNMENT
-
-def save_to_docx(questions, docx_file="final_questions.docx", image_associator=None):
-    """Save approved questions to a Word file with clear formatting and bold labels."""
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from itertools import chain, repeat
+from io import BytesIO
+from xml.sax.saxutils import escape
+from .utils.manual_review import review_question_list
+
+# python-docx, the PDF/DOCX extractors and the NLP/LLM generators are imported
+# inside the functions that use them, so importing this module (e.g. for
+# run_pipeline_web from the web app) stays cheap. The storage package is
+# imported the same way: it loads .env (override=True) as an import side effect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_bytes(data):
+    """UTF-8 JSON indented like storage.write_json writes it; encoded by orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+# The intermediate snapshot is only written (for persistence), never read back
+# by the app, so it is stored gzipped; level 6 keeps most of level 9's ratio.
+# The web review pages rewrite it after each decision or edit through
+# save_questions_to_file, with these same helpers. It used to be the uncompressed
+# answer_key_gen/intermediate_questions.json: blobs left at that path are no
+# longer updated and can be deleted, or read with their old content
+_INTERMEDIATE_JSON_PATH = "answer_key_gen/intermediate_questions.json.gz"
+
+def _json_gz_bytes(json_bytes):
+    """Gzipped JSON bytes for the intermediate snapshot."""
+    return gzip.compress(json_bytes, compresslevel=6)
+
+_W_NSDECL = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+# Tabs and line breaks inside run text become <w:tab/>/<w:br/>, as python-docx's run.text does
+_RUN_TEXT_SPECIALS = str.maketrans({
+    "\t": '</w:t><w:tab/><w:t xml:space="preserve">',
+    "\n": '</w:t><w:br/><w:t xml:space="preserve">',
+    "\r": '</w:t><w:br/><w:t xml:space="preserve">',
+})
+
+def _run_xml(text, bold=False):
+    return (
+        f'<w:r>{"<w:rPr><w:b/></w:rPr>" if bold else ""}<w:t xml:space="preserve">'
+        f'{escape(text or "").translate(_RUN_TEXT_SPECIALS)}</w:t></w:r>'
+    )
+
+def _make_para(body, runs):
+    """Append a paragraph of (text, bold) runs to the document body, built as one XML fragment."""
+    from docx.oxml import parse_xml
+    runs_xml = "".join(_run_xml(text, bold) for text, bold in runs)
+    p = parse_xml(f"<w:p {_W_NSDECL}>{runs_xml}</w:p>")
+    body._insert_p(p)
+    return p
+
+@cache
+def _template_bytes(margins=None):
+    """
+    A blank .docx with the Normal style (Calibri 11pt) and, when given, the
+    (top, bottom, left, right) page margins applied; built once per layout.
+    """
+    from docx import Document
+    from docx.shared import Pt
     doc = Document()
+    if margins is not None:
+        for section in doc.sections:
+            section.top_margin, section.bottom_margin, section.left_margin, section.right_margin = margins
+    # Adjust font size for readability
+    style = doc.styles['Normal']
+    style.font.name = 'Calibri'
+    style.font.size = Pt(11)
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+@cache
+def _template_document(margins=None):
+    """The cached template, parsed once; only ever deep-copied, never edited."""
+    from docx import Document
+    return Document(BytesIO(_template_bytes(margins)))
+
+def _new_document(margins=None):
+    """
+    A fresh Document copied from the parsed template; deep-copying the parts
+    and their XML trees is several times faster than unzipping and parsing
+    the template again.
+    """
+    return copy.deepcopy(_template_document(margins))
+
+_DOCUMENT_PART = "word/document.xml"
+
+@cache
+def _template_parts(margins=None):
+    """(name, bytes) of every part of the cached template, in archive order."""
+    with zipfile.ZipFile(BytesIO(_template_bytes(margins))) as zf:
+        return tuple((name, zf.read(name)) for name in zf.namelist())
+
+def _save_document(doc, docx_file, margins=None):
+    """
+    Write a document opened by _new_document(margins) whose edits are confined
+    to its body. Only word/document.xml is serialized; styles, settings and
+    the other parts are copied as-is from the template, skipping python-docx's
+    walk over every part on save. Documents that gained parts (pictures) must
+    go through _save_package instead.
+    """
+    from docx.opc.oxml import serialize_part_xml
+    document_xml = serialize_part_xml(doc.element)
+    with zipfile.ZipFile(docx_file, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for name, blob in _template_parts(margins):
+            zf.writestr(name, document_xml if name == _DOCUMENT_PART else blob)
+
+class _FastZipPkgWriter:
+    """Stands in for python-docx's zip writer, deflating at compresslevel 1."""
+
+    def __init__(self, zf):
+        self._zf = zf
+
+    def write(self, pack_uri, blob):
+        self._zf.writestr(pack_uri.membername, blob)
+
+def _save_package(doc, docx_file):
+    """
+    doc.save for documents that gained parts (pictures): the same parts
+    through python-docx's PackageWriter steps, deflated at compresslevel 1
+    rather than zipfile's default, which dominates the save for large files.
+    """
+    from docx.opc.pkgwriter import PackageWriter
+    package = doc.part.package
+    parts = package.parts
+    for part in parts:
+        part.before_marshal()
+    with zipfile.ZipFile(docx_file, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        writer = _FastZipPkgWriter(zf)
+        PackageWriter._write_content_types_stream(writer, parts)
+        PackageWriter._write_pkg_rels(writer, package.rels)
+        PackageWriter._write_parts(writer, parts)
+
+def _question_fields(questions):
+    """
+    (question, bloom, marks, keywords) text of each question, read in one
+    pass and shared by the answer key and the question paper.
+    """
+    return [
+        (q.get("question", ""), q.get("bloom", ""), str(q.get("marks", "")),
+         ", ".join(q.get("keywords_used", ())))
+        for q in questions
+    ]
+
+def _diagram_blob_paths(diagram):
+    """Blob paths of a question's diagram reference(s), given as a string or a list."""
+    # Handle both string and list cases
+    if isinstance(diagram, str):
+        diagram = [diagram]
+    elif not isinstance(diagram, list):
+        return []
+    # Convert relative paths to blob paths (remove ./ if present)
+    return [
+        ref.lstrip('./') if isinstance(ref, str) and ref.startswith('./') else ref
+        for ref in diagram if ref
+    ]
+
+_DIAGRAM_FETCH_WORKERS = 16
+
+# Answer-key diagram width, 4 inches, in EMU (python-docx lengths are int
+# subclasses, so a plain int works without importing docx.shared here)
+_PICTURE_WIDTH = 4 * 914400
+
+def _fetch_diagram(storage, blob_path):
+    """Bytes of a diagram blob, or None when it is not in blob storage."""
+    if not storage.is_blob_storage():
+        return None
+    # read_file raises FileNotFoundError for a missing blob, so one request
+    # answers both "is it there" and "what is in it"
+    try:
+        return storage.read_file(blob_path)
+    except FileNotFoundError:
+        return None
+
+def _prefetch_diagrams(storage, blob_paths):
+    """
+    {blob_path: bytes or None} for the given diagrams, downloaded concurrently.
+    Paths whose download failed are left out.
+    """
+    with ThreadPoolExecutor(max_workers=min(_DIAGRAM_FETCH_WORKERS, len(blob_paths))) as executor:
+        futures = {path: executor.submit(_fetch_diagram, storage, path) for path in blob_paths}
+    return {path: f.result() for path, f in futures.items() if f.exception() is None}
+
+def save_to_docx(questions, docx_file="final_questions.docx", image_associator=None, fields=None):
+    """
+    Save approved questions to a Word file with clear formatting and bold
+    labels. docx_file may be a path or a writable binary file object.
+    """
+    if fields is None:
+        fields = _question_fields(questions)
+    doc = _new_document()
     doc.add_heading("Final Approved Questions", level=1)
+    body = doc.element.body
+    has_pictures = False
+    # Diagram bytes by blob path (None when missing), all downloaded up front
+    # and concurrently; any whose download failed are retried (and reported)
+    # by the question that uses them
+    diagram_paths = [_diagram_blob_paths(q.get("diagram")) for q in questions]
+    unique_paths = list(dict.fromkeys(path for paths in diagram_paths for path in paths))
+    image_cache = {}
+    storage = None
+    if unique_paths:
+        try:
+            from storage import get_storage_client
+            storage = get_storage_client()
+            image_cache = _prefetch_diagrams(storage, unique_paths)
+        except Exception:
+            pass
 
-    for i, q in enumerate(questions, start=1):
+    for i, (q, (question, bloom, marks, keywords), blob_paths) in enumerate(zip(questions, fields, diagram_paths), start=1):
         # Add question number
-        doc.add_paragraph(f"Q{i}.")
+        _make_para(body, [(f"Q{i}.", False)])
 
         # Add each field with bold label
-        p = doc.add_paragraph()
-        p.add_run("Question: ").bold = True
-        p.add_run(q.get("question", ""))
+        _make_para(body, [("Question: ", True), (question, False)])
 
         # Add diagram if available (can be string or list)
         if "diagram" in q and q["diagram"]:
@@ -36,56 +235,32 @@ def save_to_docx(questions, docx_file="final_questions.docx", image_associator=N
                 # Add image to document
                 doc.add_paragraph("Diagram:")
                 
-                # Handle both string and list cases
-                diagram_refs = q["diagram"]
-                if isinstance(diagram_refs, str):
-                    diagram_refs = [diagram_refs]
-                elif not isinstance(diagram_refs, list):
-                    diagram_refs = []
-                
                 # Load image from Azure blob storage
-                import tempfile
-                from storage import get_storage_client
-                
-                storage = get_storage_client()
+                if storage is None:
+                    from storage import get_storage_client
+                    storage = get_storage_client()
                 images_added = 0
                 
-                for diagram_ref in diagram_refs:
-                    if not diagram_ref:
-                        continue
-                    
-                    # Convert relative path to blob path (remove ./ if present)
-                    blob_path = diagram_ref.lstrip('./') if isinstance(diagram_ref, str) and diagram_ref.startswith('./') else diagram_ref
-                    
-                    if storage.is_blob_storage() and storage.exists(blob_path):
-                        try:
-                            # Download image from blob storage to temp file
-                            image_data = storage.read_file(blob_path)
-                            
-                            # Create temporary file for the image
-                            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_img:
-                                tmp_img_path = tmp_img.name
-                                tmp_img.write(image_data)
-                            
-                            try:
-                                # Add image to document
-                                doc.add_picture(tmp_img_path, width=Inches(4.0))
-                                images_added += 1
-                            finally:
-                                # Clean up temp file
-                                try:
-                                    os.unlink(tmp_img_path)
-                                except:
-                                    pass
-                        except Exception as img_error:
-                            print(f"Warning: Could not add image {blob_path}: {img_error}")
-                    else:
-                        print(f"Warning: Diagram not found in Azure blob storage: {blob_path}")
+                for blob_path in blob_paths:
+                    try:
+                        if blob_path not in image_cache:
+                            image_cache[blob_path] = _fetch_diagram(storage, blob_path)
+                        image_data = image_cache[blob_path]
+                        if image_data is None:
+                            print(f"Warning: Diagram not found in Azure blob storage: {blob_path}")
+                            continue
+
+                        # Add image to document straight from the downloaded bytes
+                        doc.add_picture(BytesIO(image_data), width=_PICTURE_WIDTH)
+                        images_added += 1
+                    except Exception as img_error:
+                        print(f"Warning: Could not add image {blob_path}: {img_error}")
                 
                 if images_added == 0:
                     # If no images were added, show the reference
                     doc.add_paragraph(f"[Image: {q['diagram']}]")
                 else:
+                    has_pictures = True
                     doc.add_paragraph("")  # Add space after image(s)
             except Exception as e:
                 print(f"Warning: Could not add image {q.get('diagram', 'unknown')}: {e}")
@@ -93,126 +268,168 @@ def save_to_docx(questions, docx_file="final_questions.docx", image_associator=N
                 traceback.print_exc()
                 doc.add_paragraph(f"[Image: {q.get('diagram', 'unknown')}]")
 
-        p = doc.add_paragraph()
-        p.add_run("Bloom: ").bold = True
-        p.add_run(q.get("bloom", ""))
-
-        p = doc.add_paragraph()
-        p.add_run("Marks: ").bold = True
-        p.add_run(str(q.get("marks", "")))
-
-        keywords = ", ".join(q.get("keywords_used", []))
-        p = doc.add_paragraph()
-        p.add_run("Keywords Used: ").bold = True
-        p.add_run(keywords)
+        _make_para(body, [("Bloom: ", True), (bloom, False)])
+        _make_para(body, [("Marks: ", True), (marks, False)])
+        _make_para(body, [("Keywords Used: ", True), (keywords, False)])
 
         # Add answer if available
         if "answer" in q:
-            p = doc.add_paragraph()
-            p.add_run("Answer: ").bold = True
-            p.add_run(q.get("answer", ""))
+            _make_para(body, [("Answer: ", True), (q.get("answer", ""), False)])
 
         # Add a blank line between questions
-        doc.add_paragraph("")
+        _make_para(body, [])
 
-    # Optional: adjust font size for readability
-    style = doc.styles['Normal']
-    style.font.name = 'Calibri'
-    style.font.size = Pt(11)
+    if has_pictures:
+        _save_package(doc, docx_file)
+    else:
+        _save_document(doc, docx_file)
+    if isinstance(docx_file, str):
+        print(f"Questions also saved to {docx_file}")
 
-    doc.save(docx_file)
-    print(f"Questions also saved to {docx_file}")
+_TC_OPEN_XML = '<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr><w:p>'
+_TC_CLOSE_XML = '</w:p></w:tc>'
 
-def save_question_paper_to_docx(questions, docx_file="question_paper.docx"):
+def _add_filled_table(doc, rows, col_widths):
+    """
+    Append a table holding the given rows of cell texts, the first row in
+    bold, built as one XML fragment with every cell's width (from
+    col_widths) already in place. Grid columns share the text width evenly.
+    """
+    from docx.oxml import parse_xml
+    from docx.shared import Emu
+    from docx.table import Table
+    section = doc.sections[-1]
+    n_cols = len(rows[0])
+    width = Emu((section.page_width - section.left_margin - section.right_margin) // n_cols).twips
+    # Cell openers with the width in twips, formatted once per column
+    tc_opens = [_TC_OPEN_XML.format(width=w.twips) for w in col_widths]
+    row_xml = "".join(
+        "<w:tr>" + "".join(
+            tc_open + _run_xml(text, r == 0) + _TC_CLOSE_XML
+            for tc_open, text in zip(tc_opens, cells)
+        ) + "</w:tr>"
+        for r, cells in enumerate(rows)
+    )
+    grid_xml = f'<w:gridCol w:w="{width}"/>' * n_cols
+    tbl = parse_xml(
+        f'<w:tbl {_W_NSDECL}>'
+        '<w:tblPr><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+        f'<w:tblGrid>{grid_xml}</w:tblGrid>'
+        f'{row_xml}</w:tbl>'
+    )
+    doc.element.body._insert_tbl(tbl)
+    return Table(tbl, doc._body)
+
+def save_question_paper_to_docx(questions, docx_file="question_paper.docx", fields=None):
     """
     Save questions to a Word file in table format for question paper.
     Format: Q1 | Question | Bloom's Level | Marks
+    docx_file may be a path or a writable binary file object.
     """
-    doc = Document()
-    
-    # Reduce page margins for a cleaner layout
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(0.8)
-        section.bottom_margin = Inches(0.8)
-        section.left_margin = Inches(0.6)
-        section.right_margin = Inches(0.6)
+    from docx.enum.table import WD_TABLE_ALIGNMENT
+    from docx.shared import Inches
+    # Reduced page margins for a cleaner layout
+    margins = (Inches(0.8), Inches(0.8), Inches(0.6), Inches(0.6))
+    doc = _new_document(margins=margins)
     
     doc.add_heading("Question Paper", level=1)
     
-    # Create table with headers
-    table = doc.add_table(rows=1, cols=4)
+    # Header (bold) and one row per question, created together rather than
+    # growing the table a row at a time
+    rows = [('QNo.', 'Question', "Bloom's Level", 'Marks')]
+    if fields is None:
+        fields = _question_fields(questions)
+    rows.extend(
+        (f"Q{i}", question, bloom, marks)
+        for i, (question, bloom, marks, _) in enumerate(fields, start=1)
+    )
+    # Column widths in inches, written into every cell as the rows are built
+    col_widths = [Inches(0.7), Inches(5.0), Inches(1.0), Inches(0.6)]
+    table = _add_filled_table(doc, rows, col_widths)
     table.style = 'Table Grid'
     table.alignment = WD_TABLE_ALIGNMENT.CENTER
-    
-    # Add header row
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'QNo.'
-    hdr_cells[1].text = 'Question'
-    hdr_cells[2].text = "Bloom's Level"
-    hdr_cells[3].text = 'Marks'
-    
-    # Make header bold
-    for cell in hdr_cells:
-        for paragraph in cell.paragraphs:
-            for run in paragraph.runs:
-                run.bold = True
-    
-    # Add question rows
-    for i, q in enumerate(questions, start=1):
-        row = table.add_row()
-        cells = row.cells
-        cells[0].text = f"Q{i}"
-        cells[1].text = q.get("question", "")
-        cells[2].text = q.get("bloom", "")
-        cells[3].text = str(q.get("marks", ""))
-    
-    # Set specific column widths for better space utilization
-    # Use a more direct approach to control column widths
-    
 
     # Disable autofit
     table.allow_autofit = False
     table.autofit = False
+    
+    _save_document(doc, docx_file, margins)
+    if isinstance(docx_file, str):
+        print(f"Question paper saved to {docx_file}")
 
-    # Define column widths in inches
-    col_widths = [Inches(0.7), Inches(5.0), Inches(1.0), Inches(0.6)]
-
-    for row in table.rows:
-        for i, width in enumerate(col_widths):
-            cell = row.cells[i]
-            cell.width = width
-            
-            # Set the width at XML level
-            tc = cell._tc
-            tcPr = tc.get_or_add_tcPr()
-            tcW = OxmlElement('w:tcW')
-            tcW.set(qn('w:w'), str(int(width.inches * 1440)))  # width in twips
-            tcW.set(qn('w:type'), 'dxa')
-            tcPr.append(tcW)
+def save_documents(questions, docx_file="final_questions.docx", question_paper_file="question_paper.docx"):
+    """
+    Save both the answer key and the question paper, reading each question's
+    fields once. The two documents are built on separate threads: the answer
+    key waits on diagram downloads and lxml releases the GIL while parsing
+    and serializing, so the paper is built in the meantime.
+    """
+    # python-docx's modules import each other circularly; finish importing it on
+    # this thread so the two builders cannot deadlock importing it at once
+    import docx  # noqa: F401
+    fields = _question_fields(questions)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        answer_key = executor.submit(save_to_docx, questions, docx_file, None, fields)
+        question_paper = executor.submit(save_question_paper_to_docx, questions, question_paper_file, fields)
+        answer_key.result()
+        question_paper.result()
 
-    
-    # Optional: adjust font size for readability
-    style = doc.styles['Normal']
-    style.font.name = 'Calibri'
-    style.font.size = Pt(11)
-    
-    doc.save(docx_file)
-    print(f"Question paper saved to {docx_file}")
+# Used when the web interface does not say how many questions it wants; the
+# web app has no terminal to prompt on
+_WEB_QUESTIONS_PER_TOPIC = 3
 
-def run_pipeline_web(input_path: str, output_file: str = "generated_questions.json", questions_per_topic: int = None):
-    """Pipeline execution for web interface - always skips manual review"""
+def run_pipeline_web(input_path: str, output_file: str = "generated_questions.json", questions_per_topic: int = _WEB_QUESTIONS_PER_TOPIC):
+    """
+    Pipeline execution for web interface - always skips manual review.
+    Returns the generated questions, as saved to the intermediate file.
+    """
     print("🌐 WEB INTERFACE MODE - Starting pipeline for Streamlit")
     print(f"DEBUG: run_pipeline_web called with skip_manual_review=True")
     print(f"DEBUG: About to call run_pipeline with skip_manual_review=True")
     return run_pipeline(input_path, output_file, questions_per_topic, skip_manual_review=True)
 
+def _questions_per_topic_from_env():
+    """QUESTIONS_PER_TOPIC as a positive int, or None when it is not set."""
+    value = os.getenv("QUESTIONS_PER_TOPIC")
+    if not value:
+        return None
+    count = int(value)
+    if count <= 0:
+        raise ValueError(f"QUESTIONS_PER_TOPIC must be a positive number, got {value!r}")
+    return count
+
+def _blob_storage():
+    """The shared storage client, which the pipeline requires to be Azure blob storage."""
+    from storage import get_storage_client
+    storage = get_storage_client()
+    if not storage.is_blob_storage():
+        raise RuntimeError("Blob storage is not configured. Please configure Azure storage.")
+    return storage
+
+def _load_keyword_extractor():
+    from .utils.keyword_extractor import KeywordExtractor
+    return KeywordExtractor()
+
 def run_pipeline(input_path: str, output_file: str = "generated_questions.json", questions_per_topic: int = None, skip_manual_review: bool = False):
-    """Main pipeline execution"""
+    """Main pipeline execution; returns all generated questions (after any CLI review)"""
     print("Starting textbook processing pipeline")
     print(f"DEBUG: skip_manual_review parameter = {skip_manual_review}")
     print(f"DEBUG: type of skip_manual_review = {type(skip_manual_review)}")
+
+    # Batch jobs set QUESTIONS_PER_TOPIC instead of answering the prompt; with
+    # no terminal to prompt on, fail now rather than after extraction
+    if questions_per_topic is None:
+        questions_per_topic = _questions_per_topic_from_env()
+    if questions_per_topic is None and not sys.stdin.isatty():
+        raise RuntimeError("questions_per_topic was not given and there is no terminal to ask on; pass it or set QUESTIONS_PER_TOPIC")
     
+    # Load the keyword models (KeyBERT, spaCy) in the background while the
+    # textbook is being read
+    loader = ThreadPoolExecutor(max_workers=1)
+    keyword_extractor_future = loader.submit(_load_keyword_extractor)
+    loader.shutdown(wait=False)
+
     # 1. Text Extraction
     print("Extracting topics from textbook...")
     start = time.time()
@@ -220,10 +437,12 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
     # Use appropriate extractor based on file type
     topic_images = {}  # Store images associated with topics
     if input_path.lower().endswith('.pdf'):
+        from .utils.pdf_extractor import extract_topics as extract_topics_pdf
         topics = extract_topics_pdf(input_path)
         print(f"Extracted {len(topics)} topics from PDF in {time.time()-start:.1f}s")
     elif input_path.lower().endswith('.docx'):
         # Extract both topics and images together
+        from .utils.docx_extractor import extract_topics_with_images
         topics, topic_images = extract_topics_with_images(input_path, "answer_key_gen")
         print(f"Extracted {len(topics)} topics from DOCX in {time.time()-start:.1f}s")
         print(f"Extracted images for {len([t for t in topic_images if topic_images[t]])} topics")
@@ -232,7 +451,7 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
     
     # 2. Keyword Extraction
     print("Extracting keywords...")
-    keyword_extractor = KeywordExtractor()
+    keyword_extractor = keyword_extractor_future.result()
     start = time.time()
     keywords_dict = keyword_extractor.process_topics(topics)
     print(f"Extracted keywords in {time.time()-start:.1f}s")
@@ -254,6 +473,7 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
     
     # 4. Question Generation
     print("Generating questions...")
+    from .question_generation.question_generator import QuestionGenerator
     qg = QuestionGenerator()
     start = time.time()
     questions = qg.generate_for_topics(topics, keywords_dict, questions_per_topic=questions_per_topic)
@@ -263,20 +483,17 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
     if topic_images:
         print("Associating images with questions based on topics...")
         
-        for i, question in enumerate(questions):
-            question_id = f"Q{i+1}"
-            topic = list(topics.keys())[i // questions_per_topic] if i // questions_per_topic < len(topics) else "Unknown"
-            
-            # Get images associated with this topic
-            topic_image_list = topic_images.get(topic, [])
-            
+        # Owning topic of each question slot, questions_per_topic slots per topic
+        question_topics = list(chain.from_iterable(repeat(topic, questions_per_topic) for topic in topics))
+        # Each topic's unused images, handed out from the front
+        available_images = {topic: deque(images) for topic, images in topic_images.items()}
+        
+        for question, topic in zip(questions, question_topics):
+            # Use the first unused image for this topic, marking it used
+            topic_image_list = available_images.get(topic)
             if topic_image_list:
-                # Use the first image for this topic
-                image_info = topic_image_list[0]
+                image_info = topic_image_list.popleft()
                 question["diagram"] = image_info["relative_path"]
-                
-                # Mark this image as used (remove from available list)
-                topic_images[topic].pop(0)
             else:
                 question["diagram"] = None
     else:
@@ -285,16 +502,13 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
             question["diagram"] = None
     
     # 4. Save intermediate results to Azure blob storage ONLY
-    intermediate_json_path_str = "answer_key_gen/intermediate_questions.json"
+    intermediate_json_path_str = _INTERMEDIATE_JSON_PATH
     
-    # Save to blob storage ONLY
+    # Save to blob storage ONLY; the same client is used for every later upload
     try:
-        from storage import get_storage_client
-        storage = get_storage_client()
-        if not storage.is_blob_storage():
-            raise RuntimeError("Blob storage is not configured. Please configure Azure storage.")
-        
-        storage.write_json(intermediate_json_path_str, questions)
+        storage = _blob_storage()
+        intermediate_json = _json_bytes(questions)
+        storage.write_file(intermediate_json_path_str, _json_gz_bytes(intermediate_json))
         print(f"✅ Saved intermediate questions to Azure blob storage: {intermediate_json_path_str}")
     except Exception as e:
         print(f"❌ Failed to save intermediate questions to blob storage: {e}")
@@ -303,42 +517,27 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
     # 5. Manual Review (skip if called from Streamlit)
     print(f"DEBUG: About to check skip_manual_review = {skip_manual_review}")
     
-    # Load questions from Azure blob storage for manual review
-    try:
-        from storage import get_storage_client
-        storage = get_storage_client()
-        if not storage.is_blob_storage():
-            raise RuntimeError("Blob storage is not configured.")
-        
-        all_questions = storage.read_json(intermediate_json_path_str)
-    except Exception as e:
-        print(f"❌ Failed to load intermediate questions from blob storage: {e}")
-        raise
+    # The questions just saved are still in memory; review them directly
+    all_questions = questions
     
     if not skip_manual_review:
         print("\nStarting manual review process...")
         print("🔍 CLI Manual Review Mode - Interactive review in terminal")
-        # For CLI review, we need a local temp file
-        temp_review_path = Path("temp_review_questions.json")
-        with open(temp_review_path, "w") as f:
-            json.dump(all_questions, f, indent=2)
-        review_questions(temp_review_path)
-        
-        # Reload from temp file after review
-        with open(temp_review_path, "r") as f:
-            all_questions = json.load(f)
-        temp_review_path.unlink()  # Clean up temp file
+        review_question_list(all_questions)
         
         # 6. Filter and save only approved questions
         print("\nFiltering approved questions...")
         approved_questions = [q for q in all_questions if q.get("approved", False)]
         
         # Save updated questions back to Azure
-        storage.write_json(intermediate_json_path_str, all_questions)
+        storage.write_file(intermediate_json_path_str, _json_gz_bytes(_json_bytes(all_questions)))
+        final_json = _json_bytes(approved_questions)
     else:
         print("\n🌐 WEB INTERFACE MODE - Skipping CLI manual review")
         print("📝 Questions will be reviewed in the web interface")
         approved_questions = all_questions  # Don't filter, let web interface handle approval
+        # Unchanged since the intermediate save, so its encoding is reused
+        final_json = intermediate_json
     
     # Save approved questions to Azure blob storage ONLY
     final_json_path_str = "answer_key_gen/final_questions.json"
@@ -347,12 +546,7 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
     
     # Save final JSON to blob storage ONLY
     try:
-        from storage import get_storage_client
-        storage = get_storage_client()
-        if not storage.is_blob_storage():
-            raise RuntimeError("Blob storage is not configured.")
-        
-        storage.write_json(final_json_path_str, approved_questions)
+        storage.write_file(final_json_path_str, final_json)
         print(f"✅ Saved final questions to Azure blob storage: {final_json_path_str}")
     except Exception as e:
         print(f"❌ Failed to save final questions to blob storage: {e}")
@@ -360,43 +554,23 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
 
     # Only generate final documents if not skipping manual review
     if not skip_manual_review:
-        # Generate to temp files first, then upload to Azure
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_docx1:
-            temp_docx1_path = tmp_docx1.name
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_docx2:
-            temp_docx2_path = tmp_docx2.name
+        # Generate in memory, then upload to Azure
+        answer_key_buf, question_paper_buf = BytesIO(), BytesIO()
+        save_documents(approved_questions, answer_key_buf, question_paper_buf)
         
+        # Upload final DOCX files to blob storage ONLY
         try:
-            save_to_docx(approved_questions, temp_docx1_path, None)
-            save_question_paper_to_docx(approved_questions, temp_docx2_path)
-            
-            # Upload final DOCX files to blob storage ONLY
-            try:
-                from storage import get_storage_client
-                storage = get_storage_client()
-                if not storage.is_blob_storage():
-                    raise RuntimeError("Blob storage is not configured.")
-                
-                # Upload answer key
-                with open(temp_docx1_path, "rb") as f:
-                    storage.write_file(final_docx_path_str, f.read())
+            # Upload the answer key and question paper concurrently
+            with ThreadPoolExecutor(max_workers=2) as uploader:
+                answer_key_upload = uploader.submit(storage.write_file, final_docx_path_str, answer_key_buf.getvalue())
+                question_paper_upload = uploader.submit(storage.write_file, question_paper_path_str, question_paper_buf.getvalue())
+                answer_key_upload.result()
                 print(f"✅ Saved final answer key to Azure blob storage: {final_docx_path_str}")
-                
-                # Upload question paper
-                with open(temp_docx2_path, "rb") as f:
-                    storage.write_file(question_paper_path_str, f.read())
+                question_paper_upload.result()
                 print(f"✅ Saved question paper to Azure blob storage: {question_paper_path_str}")
-            except Exception as e:
-                print(f"❌ Failed to upload final documents to blob storage: {e}")
-                raise
-        finally:
-            # Clean up temp files
-            try:
-                os.unlink(temp_docx1_path)
-                os.unlink(temp_docx2_path)
-            except:
-                pass
+        except Exception as e:
+            print(f"❌ Failed to upload final documents to blob storage: {e}")
+            raise
         
         print(f"\n✅ Pipeline completed!")
         print(f"Total questions generated: {len(all_questions)}")
@@ -414,11 +588,12 @@ def run_pipeline(input_path: str, output_file: str = "generated_questions.json",
         print(f"📄 Final documents will be generated after web-based review")
         print(f"✅ Ready for Streamlit web interface!")
 
+    return all_questions
+
 
 
 
 if __name__ == "__main__":
-    import sys
     if len(sys.argv) < 2:
         print("Usage: python pipeline.py <textbook_path.pdf> [output_file.json]")
         sys.exit(1)
@@ -1,6 +1,9 @@
 from typing import List, Dict
+import multiprocessing
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 from pathlib import Path
 
 try:
@@ -10,6 +13,131 @@ except ImportError:
     PDF_AVAILABLE = False
     print("Warning: PyMuPDF not installed. Install with: pip install PyMuPDF")
 
+# Below this many pages the process pool start-up costs more than it saves
+_PARALLEL_MIN_PAGES = 16
+_MAX_WORKERS = 8
+
+# Workers are spawned, not forked: extraction runs inside the threaded
+# Streamlit server (run_pipeline_web), and a forked child could inherit locks
+# held by its other threads and the open HTTP connection pools. A spawned
+# worker starts a fresh interpreter and only imports this module and PyMuPDF
+_POOL_CONTEXT = multiprocessing.get_context("spawn")
+
+_TOKEN_RE = re.compile(r'\b\w+\b')
+
+
+def _tokens(text: str) -> frozenset:
+    """Lower-cased word set used for topic/context matching."""
+    return frozenset(_TOKEN_RE.findall(text.lower()))
+
+
+def _text_near(words, rect) -> str:
+    """Text of the page words overlapping rect, one line per text line (as page.get_textbox gives)."""
+    lines = {}
+    for x0, y0, x1, y1, word, block_no, line_no, _ in words:
+        if x0 < rect.x1 and x1 > rect.x0 and y0 < rect.y1 and y1 > rect.y0:
+            lines.setdefault((block_no, line_no), []).append(word)
+    return "\n".join(" ".join(line) for line in lines.values())
+
+
+# Embedded image formats written out as stored, without decoding; others are
+# converted to PNG so every saved image can go into a DOCX
+_NATIVE_EXTS = frozenset({"png", "jpeg", "jpg"})
+
+
+def _save_image(doc, xref: int, stem: Path):
+    """
+    Save image xref as stem + extension and return its path, or None for
+    CMYK images, which are skipped. PNG/JPEG streams are copied verbatim.
+    """
+    try:
+        base = doc.extract_image(xref)
+    except Exception:
+        base = None
+    if base and base.get("ext") in _NATIVE_EXTS and base.get("colorspace", 0) < 4:
+        img_path = stem.with_name(f"{stem.name}.{base['ext']}")
+        img_path.write_bytes(base["image"])
+        return img_path
+    
+    pix = fitz.Pixmap(doc, xref)
+    # Skip if not RGB/GRAY
+    if pix.n - pix.alpha >= 4:
+        return None
+    img_path = stem.with_name(f"{stem.name}.png")
+    pix.save(str(img_path))
+    return img_path
+
+
+def _extract_page_images(doc, page_num: int, output_dir: Path) -> List[Dict]:
+    """Save the images of one page and return their cache entries."""
+    entries = []
+    page = doc[page_num]
+    
+    # Get images on this page
+    image_list = page.get_images()
+    if not image_list:
+        return entries
+    
+    # Image placements and the page's words are read once per page, not once
+    # per image; an image placed several times uses its first placement.
+    # If either lookup fails, every image gets the generic page context
+    image_bboxes = {}
+    words = None
+    try:
+        for info in page.get_image_info(xrefs=True):
+            image_bboxes.setdefault(info["xref"], info["bbox"])
+        words = page.get_text("words")
+    except Exception:
+        image_bboxes = None
+    
+    for img_index, img in enumerate(image_list):
+        try:
+            # Save image to file (None: skipped)
+            xref = img[0]
+            img_path = _save_image(doc, xref, output_dir / f"page_{page_num}_img_{img_index}")
+            
+            if img_path is not None:
+                # Get surrounding text for context
+                context = f"Image from page {page_num}" if image_bboxes is None else ""
+                try:
+                    bbox = image_bboxes.get(xref) if image_bboxes is not None else None
+                    if bbox is not None:
+                        img_rect = fitz.Rect(bbox)
+                        # Get text around the image
+                        expanded_rect = fitz.Rect(
+                            img_rect.x0 - 50, img_rect.y0 - 50,
+                            img_rect.x1 + 50, img_rect.y1 + 50
+                        )
+                        context = _text_near(words, expanded_rect)
+                except:
+                    context = f"Image from page {page_num}"
+                
+                entries.append({
+                    "path": str(img_path),
+                    "page": page_num,
+                    "context": context,
+                    "score": 0.0
+                })
+            
+        except Exception as e:
+            print(f"Warning: Could not extract image {img_index} from page {page_num}: {e}")
+            continue
+    return entries
+
+
+def _extract_page_range(pdf_path: str, output_dir: Path, start: int, stop: int) -> List[Dict]:
+    """
+    Extract the images of pages [start, stop) (process pool worker). PyMuPDF
+    documents must not be shared between threads or processes, so each
+    worker opens its own.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        return [entry for page_num in range(start, stop)
+                for entry in _extract_page_images(doc, page_num, output_dir)]
+    finally:
+        doc.close()
+
 
 class TextbookImageExtractor:
     """Extract images from PDF textbook."""
@@ -18,6 +146,8 @@ class TextbookImageExtractor:
         """Initialize with PDF path."""
         self.pdf_path = pdf_path
         self.images_cache = []
+        # Context word set of each cached image, parallel to images_cache
+        self._context_tokens = []
         
         if not PDF_AVAILABLE:
             print("Warning: PyMuPDF not available. Image extraction disabled.")
@@ -31,62 +161,33 @@ class TextbookImageExtractor:
         except Exception as e:
             print(f"Warning: Could not extract images from PDF {pdf_path}: {e}")
             self.images_cache = []
+        self._context_tokens = [_tokens(img['context']) for img in self.images_cache]
 
     def _extract_images_from_pdf(self, doc):
-        """Extract all images from the PDF and save them."""
+        """
+        Extract all images from the PDF and save them. Books of
+        _PARALLEL_MIN_PAGES or more pages are split into contiguous page
+        ranges, one per worker process; entries stay in page order.
+        """
         self.images_cache = []
         
         # Create output directory
         output_dir = Path(self.pdf_path).parent / "extracted_images"
         output_dir.mkdir(exist_ok=True)
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Get images on this page
-            image_list = page.get_images()
-            
-            for img_index, img in enumerate(image_list):
-                try:
-                    # Get image data
-                    xref = img[0]
-                    pix = fitz.Pixmap(doc, xref)
-                    
-                    # Skip if not RGB/GRAY
-                    if pix.n - pix.alpha < 4:
-                        # Save image to file
-                        img_filename = f"page_{page_num}_img_{img_index}.png"
-                        img_path = output_dir / img_filename
-                        
-                        pix.save(str(img_path))
-                        
-                        # Get surrounding text for context
-                        context = ""
-                        try:
-                            img_rects = page.get_image_rects(xref)
-                            if img_rects:
-                                img_rect = img_rects[0]
-                                # Get text around the image
-                                expanded_rect = fitz.Rect(
-                                    img_rect.x0 - 50, img_rect.y0 - 50,
-                                    img_rect.x1 + 50, img_rect.y1 + 50
-                                )
-                                context = page.get_textbox(expanded_rect)
-                        except:
-                            context = f"Image from page {page_num}"
-                        
-                        self.images_cache.append({
-                            "path": str(img_path),
-                            "page": page_num,
-                            "context": context,
-                            "score": 0.0
-                        })
-                        
-                    pix = None
-                    
-                except Exception as e:
-                    print(f"Warning: Could not extract image {img_index} from page {page_num}: {e}")
-                    continue
+        n_pages = len(doc)
+        workers = min(_MAX_WORKERS, os.cpu_count() or 1)
+        if n_pages < _PARALLEL_MIN_PAGES or workers == 1:
+            for page_num in range(n_pages):
+                self.images_cache.extend(_extract_page_images(doc, page_num, output_dir))
+            return
+        
+        step = -(-n_pages // workers)
+        starts = range(0, n_pages, step)
+        stops = [min(start + step, n_pages) for start in starts]
+        with ProcessPoolExecutor(max_workers=len(starts), mp_context=_POOL_CONTEXT) as executor:
+            results = executor.map(_extract_page_range, repeat(self.pdf_path), repeat(output_dir), starts, stops)
+            self.images_cache = list(chain.from_iterable(results))
 
     def find_images_for_topic(self, topic: str, 
                               num_images: int = 2,
@@ -95,16 +196,13 @@ class TextbookImageExtractor:
         if not self.images_cache:
             return []
         
-        # Simple keyword matching
-        topic_words = set(re.findall(r'\b\w+\b', topic.lower()))
+        # Simple keyword matching against the context words tokenized at extraction
+        topic_words = _tokens(topic)
         
         scored_images = []
-        for img in self.images_cache:
-            # Calculate simple relevance score
-            context_words = set(re.findall(r'\b\w+\b', img['context'].lower()))
-            
+        for img, context_words in zip(self.images_cache, self._context_tokens):
             # Count word overlaps
-            overlap = len(topic_words.intersection(context_words))
+            overlap = len(topic_words & context_words)
             img['score'] = overlap / max(len(topic_words), 1)
             
             if img['score'] >= min_score:
@@ -1,11 +1,92 @@
+import functools
+import gzip
+import hashlib
+import json
+import re
 import requests
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
-from typing import Dict, List
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load environment variables
 load_dotenv()
 
+# Answers are requested concurrently; the session keeps this many connections alive
+_MAX_WORKERS = 8
+
+# Rate limits and transient OpenRouter failures are retried with exponential
+# backoff (honouring Retry-After) before the status check below sees them.
+# POSTs are only retried when the request never reached the server (connect
+# errors) or was answered with a retryable status; a read error or timeout is
+# not retried, since the model may already be generating (and billing) it,
+# and surfaces as requests.exceptions.Timeout / ConnectionError to the caller
+_RETRY = Retry(
+    total=3,
+    connect=3,
+    read=0,
+    status=3,
+    backoff_factor=1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=None,
+    raise_on_status=False,
+)
+
+def openrouter_session(headers: Dict[str, str], pool_size: int = _MAX_WORKERS) -> requests.Session:
+    """
+    A keep-alive session for OpenRouter calls, carrying the request headers,
+    with a connection pool for pool_size concurrent requests and _RETRY backoff.
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    session.mount("https://", HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=_RETRY
+    ))
+    return session
+
+def openrouter_json(res: requests.Response):
+    """
+    The parsed JSON body of an OpenRouter response; decoded by orjson when
+    installed. Malformed bodies raise json.JSONDecodeError (orjson's error
+    is a subclass of it).
+    """
+    if orjson is not None:
+        return orjson.loads(res.content)
+    return json.loads(res.content)
+
+_FAILED_ANSWER = "Answer generation failed. Please review manually."
+
+# Answers persist across runs (re-runs, retries after a crash) in storage,
+# keyed by model, Bloom level, marks, question and chunk; new entries are
+# written back every _CACHE_FLUSH_EVERY answers and after each batch. Past
+# _CACHE_MAX_ENTRIES the least recently used answers are dropped, which keeps
+# the blob (re-uploaded whole on every flush) from growing without bound
+_ANSWER_CACHE_PATH = "answer_key_gen/.answer_cache.json.gz"
+_CACHE_FLUSH_EVERY = 20
+_CACHE_MAX_ENTRIES = 5000
+
+# Common AI model artifacts stripped from answers, in removal order
+_ARTIFACTS = (
+    "<s>", "</s>", "[OUT]", "[/OUT]", "<s> [OUT]", "[/OUT] </s>",
+    "**Answer:**", "**Model Answer:**", "Answer:", "Model Answer:", "Response:",
+    "<|im_start|>", "<|im_end|>", "[INST]", "[/INST]"
+)
+# All artifacts in one pass over the answer
+_ARTIFACT_RE = re.compile("|".join(map(re.escape, _ARTIFACTS)))
+_TAG_RE = re.compile(r'<[^>]+>')
+_BRACKET_RE = re.compile(r'\[[^\]]+\]')
+_BOLD_RE = re.compile(r'\*\*([^*]+)\*\*')
+_ITAL_RE = re.compile(r'\*([^*]+)\*')
+_WS_RE = re.compile(r'\s+')
+
 class AnswerGenerator:
     def __init__(self, 
                  api_key: str = None,
@@ -25,6 +106,87 @@ class AnswerGenerator:
         }
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
 
+        # One keep-alive session shared by all answer requests
+        self._session = openrouter_session(self.headers)
+
+        # Persistent answer cache (a dict in least- to most-recently-used
+        # order), loaded on first use. _cache_lock guards it, since answers
+        # are generated from several threads, and is only ever held briefly;
+        # _flush_lock lets one flush encode and upload at a time without it
+        self._cache = None
+        self._cache_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._unflushed = 0
+
+    def _load_cache_locked(self) -> Dict[str, str]:
+        """The answer cache, loaded from storage on first use; the caller holds _cache_lock."""
+        if self._cache is None:
+            self._cache = {}
+            try:
+                from storage import get_storage_client
+                storage = get_storage_client()
+                if storage.exists(_ANSWER_CACHE_PATH):
+                    self._cache = json.loads(gzip.decompress(storage.read_file(_ANSWER_CACHE_PATH)))
+            except Exception as e:
+                print(f"Warning: Could not load answer cache: {e}")
+            self._evict_locked()
+        return self._cache
+
+    def _evict_locked(self):
+        """Drop the least recently used answers beyond _CACHE_MAX_ENTRIES."""
+        cache = self._cache
+        while len(cache) > _CACHE_MAX_ENTRIES:
+            del cache[next(iter(cache))]
+
+    def _cached_answer(self, key: str):
+        """The cached answer for key (marked most recently used), or None."""
+        with self._cache_lock:
+            cache = self._load_cache_locked()
+            answer = cache.pop(key, None)
+            if answer is not None:
+                cache[key] = answer
+            return answer
+
+    def _cache_answer(self, key: str, answer: str):
+        """Cache an answer, flushing once _CACHE_FLUSH_EVERY are unsaved."""
+        with self._cache_lock:
+            self._load_cache_locked()[key] = answer
+            self._evict_locked()
+            self._unflushed += 1
+            flush = self._unflushed >= _CACHE_FLUSH_EVERY
+        if flush:
+            self._flush_cache(wait=False)
+
+    def _flush_cache(self, wait: bool):
+        """
+        Write the cache back to storage. Only copying it holds _cache_lock;
+        encoding and uploading happen after, so other threads keep answering.
+        Without wait, a flush already in progress makes this a no-op: the
+        entries it did not include stay counted for the next flush.
+        """
+        if not self._flush_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._cache_lock:
+                if not self._unflushed:
+                    return
+                self._unflushed = 0
+                snapshot = dict(self._cache)
+            from storage import get_storage_client
+            data = json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
+            get_storage_client().write_file(_ANSWER_CACHE_PATH, gzip.compress(data, compresslevel=6))
+        except Exception as e:
+            print(f"Warning: Could not save answer cache: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def flush_answer_cache(self):
+        """Write answers cached since the last flush to storage."""
+        self._flush_cache(wait=True)
+
+    def _cache_key(self, question: str, chunk: str, bloom_level: str, marks: int) -> str:
+        return hashlib.sha256(f"{self.model}|{bloom_level}|{marks}|{question}|{chunk}".encode("utf-8")).hexdigest()
+
     def _call_openrouter(self, prompt: str) -> str:
         """Make API call to OpenRouter for answer generation"""
         payload = {
@@ -36,20 +198,20 @@ class AnswerGenerator:
         }
 
         try:
-            res = requests.post(self.api_url, headers=self.headers, json=payload, timeout=60)
+            res = self._session.post(self.api_url, json=payload, timeout=60)
 
             if res.status_code != 200:
                 print("ERROR: OpenRouter Error Response:")
                 print(res.status_code, res.text)
                 raise Exception(f"OpenRouter error: {res.status_code}")
 
-            data = res.json()
+            data = openrouter_json(res)
             return data["choices"][0]["message"]["content"].strip()
 
         except requests.exceptions.Timeout:
             print("TIMEOUT: API call timed out after 60 seconds")
             raise Exception("API timeout - try again later")
-        except requests.exceptions.JSONDecodeError:
+        except json.JSONDecodeError:
             print("ERROR: Failed to decode JSON. Raw response:")
             print(res.text)
             raise Exception("OpenRouter response was not valid JSON.")
@@ -58,17 +220,42 @@ class AnswerGenerator:
             raise
 
     def generate_answer(self, question: str, chunk: str, bloom_level: str, marks: int) -> str:
-        """Generate an answer for the given question based on the content chunk"""
+        """
+        Generate an answer for the given question based on the content chunk.
+        An answer already generated for the same inputs (this run or an
+        earlier one) is returned from the cache without calling the model.
+        """
+        key = self._cache_key(question, chunk, bloom_level, marks)
+        cached = self._cached_answer(key)
+        if cached is not None:
+            return cached
         
         # Create answer generation prompt based on Bloom's level and marks
         answer_prompt = self._create_answer_prompt(question, chunk, bloom_level, marks)
         
         try:
             answer_text = self._call_openrouter(answer_prompt)
-            return self._clean_answer(answer_text)
+            answer = self._clean_answer(answer_text)
         except Exception as e:
             print(f"ERROR: Error generating answer: {e}")
-            return "Answer generation failed. Please review manually."
+            return _FAILED_ANSWER
+        
+        # Failed answers are not cached, so a re-run tries them again
+        if answer != _FAILED_ANSWER:
+            self._cache_answer(key, answer)
+        return answer
+
+    def generate_answers(self, items: Sequence[Tuple[str, str, str, int]], max_workers: int = _MAX_WORKERS) -> List[str]:
+        """
+        Generate answers for (question, chunk, bloom_level, marks) items
+        concurrently; results are in item order.
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            answers = list(executor.map(lambda item: self.generate_answer(*item), items))
+        self.flush_answer_cache()
+        return answers
     
     def _create_answer_prompt(self, question: str, chunk: str, bloom_level: str, marks: int) -> str:
         """Create a tailored prompt for answer generation based on Bloom's taxonomy"""
@@ -107,35 +294,27 @@ Answer:"""
         
         return base_prompt
     
-    def _clean_answer(self, text: str) -> str:
-        """Clean and format the generated answer"""
-        text = text.strip()
-        
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _clean_answer(text: str) -> str:
+        """Clean and format the generated answer (cached: repeated model outputs clean once)"""
         # Remove common AI model artifacts
-        artifacts_to_remove = [
-            "<s>", "</s>", "[OUT]", "[/OUT]", "<s> [OUT]", "[/OUT] </s>",
-            "**Answer:**", "**Model Answer:**", "Answer:", "Model Answer:", "Response:",
-            "<|im_start|>", "<|im_end|>", "[INST]", "[/INST]"
-        ]
-        
-        for artifact in artifacts_to_remove:
-            text = text.replace(artifact, "").strip()
+        text = _ARTIFACT_RE.sub('', text)
         
         # Remove any remaining XML-like tags
-        import re
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'\[[^\]]+\]', '', text)
+        text = _TAG_RE.sub('', text)
+        text = _BRACKET_RE.sub('', text)
         
         # Remove markdown formatting
-        text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Remove bold
-        text = re.sub(r'\*([^*]+)\*', r'\1', text)      # Remove italic
+        text = _BOLD_RE.sub(r'\1', text)  # Remove bold
+        text = _ITAL_RE.sub(r'\1', text)  # Remove italic
         
         # Clean up extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WS_RE.sub(' ', text).strip()
         
         # If the text is too short or looks like an artifact, return a default
         if len(text) < 10 or text.startswith('<') or text.startswith('['):
-            return "Answer generation failed. Please review manually."
+            return _FAILED_ANSWER
         
         # Ensure proper ending
         if not text.endswith('.') and not text.endswith('!') and not text.endswith('?'):
@@ -1,8 +1,41 @@
 
 # src/generation/bloom_mapper.py
 # This module maps the topic content to a chunk size based on the Bloom's taxonomy level and
+from functools import cache, lru_cache
 import tiktoken
 from .bloom_config import BLOOM_CONFIG
+
+# Far more than cl100k averages (about 4), so a prefix this long almost always
+# holds enough tokens
+_MAX_CHARS_PER_TOKEN = 8
+
+# Every token-limited chunk of a topic is a prefix of its first this-many tokens
+_MAX_CHUNK_TOKENS = max(conf["chunk_size"] for conf in BLOOM_CONFIG.values() if conf["chunk_size"] != "ALL")
+
+@cache
+def _get_encoder(name="cl100k_base"):
+    """The tiktoken encoding, built once per process."""
+    return tiktoken.get_encoding(name)
+
+@lru_cache(maxsize=256)
+def _leading_tokens(topic_content):
+    """
+    The first _MAX_CHUNK_TOKENS tokens of a topic (all of them if it is
+    shorter), encoded once and shared by every question asked on it.
+    """
+    encoder = _get_encoder()
+    # Encode just a prefix generously longer than those tokens can span. It is
+    # cut at a space that follows a non-space, where a new pre-token piece
+    # always starts, so the tokens before the cut are the ones the full text
+    # would give; if it still comes up short, encode everything
+    cut = topic_content.rfind(" ", 0, _MAX_CHUNK_TOKENS * _MAX_CHARS_PER_TOKEN)
+    while cut > 0 and topic_content[cut - 1].isspace():
+        cut = topic_content.rfind(" ", 0, cut)
+    tokens = encoder.encode_ordinary(topic_content[:cut]) if cut > 0 else ()
+    if len(tokens) < _MAX_CHUNK_TOKENS:
+        tokens = encoder.encode_ordinary(topic_content)
+    return tuple(tokens[:_MAX_CHUNK_TOKENS])
+
 def get_chunk(topic_content, bloom_level, marks):
     conf = BLOOM_CONFIG[bloom_level]  # Keep key case-sensitive
 
@@ -14,8 +47,5 @@ def get_chunk(topic_content, bloom_level, marks):
     if chunk_size == "ALL":
         return topic_content
 
-    encoder = tiktoken.get_encoding("cl100k_base")
-    tokens = encoder.encode(topic_content)
-
     adjusted_size = int(chunk_size * marks / max(conf["marks"]))
-    return encoder.decode(tokens[:adjusted_size])
\ No newline at end of file
+    return _get_encoder().decode(_leading_tokens(topic_content)[:adjusted_size])
@@ -1,9 +1,18 @@
 from typing import Dict, List
-import requests
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
 from .ImageExtractor import TextbookImageExtractor
   # Your image extractor class
+from .answer_gen import openrouter_json, openrouter_session
+
+_SECTION_NAME_RE = re.compile(r'[A-Z_]+')
+_MARKS_RE = re.compile(r'MARKS:\s*(\d+)')
+_KEYWORD_RE = re.compile(r'\*\*(\w+)\*\*')
+_VISUAL_RE = re.compile(r'(\d+)\. TYPE:\s*(\w+)\s*PURPOSE:\s*(.+)')
+
+# Review materials are requested concurrently; the session keeps this many connections alive
+_MAX_WORKERS = 8
 
 class ContentGenerator:
     def __init__(self, 
@@ -22,13 +31,16 @@ class ContentGenerator:
             "HTTP-Referer": "https://yourdomain.com",
             "Content-Type": "application/json"
         }
+        # One keep-alive session shared by all review-material requests
+        self._session = openrouter_session(self.headers, _MAX_WORKERS)
         self.model = model
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
         self.image_extractor = TextbookImageExtractor(textbook_path) if textbook_path else None
 
-    def generate_review_materials(self, approved_questions: List[Dict], style: str = "answer") -> Dict:
+    def generate_review_materials(self, approved_questions: List[Dict], style: str = "answer", max_workers: int = _MAX_WORKERS) -> Dict:
         """
-        Generate complete review materials with images
+        Generate complete review materials with images; questions are sent to
+        OpenRouter concurrently and the content keeps their order
         Args:
             approved_questions: List of question dicts with:
                 - question: The question text
@@ -38,32 +50,15 @@ class ContentGenerator:
                 - chunk: Source text chunk
                 - topic: Textbook topic/section
             style: Output style (answer|study_guide|presentation)
+            max_workers: Most questions in flight at once
         Returns:
             Dictionary containing formatted content with images
         """
-        outputs = []
-        
-        for q in approved_questions:
-            # Generate base content
-            prompt = self._build_prompt(q, style)
-            response = self._call_openrouter(prompt)
-            formatted_response = self.parse_response(response)
-            
-            # Enhance with textbook images if available
-            print(self.image_extractor)
-            if self.image_extractor:
-                images = self.image_extractor.find_images_for_topic(q.get('topic', ''))
-                print(q.get('topic', ''))
-                formatted_response["textbook_images"] = [
-                    {
-                        "path": os.path.basename(img['path']),
-                        "page": img['page'],
-                        "context": img['context'][:200] + "...",
-                        "relevance": round(img['score'], 2)
-                    } for img in images[:2]  # Get top 2 images
-                ]
-            
-            outputs.append(formatted_response)
+        if approved_questions:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(approved_questions))) as executor:
+                outputs = list(executor.map(lambda q: self._review_material(q, style), approved_questions))
+        else:
+            outputs = []
             
         return {
             "content": outputs,
@@ -71,6 +66,27 @@ class ContentGenerator:
             "total_questions": len(approved_questions)
         }
 
+    def _review_material(self, q: Dict, style: str) -> Dict:
+        """Generate and parse the review material for one question, with its textbook images"""
+        # Generate base content
+        prompt = self._build_prompt(q, style)
+        response = self._call_openrouter(prompt)
+        formatted_response = self.parse_response(response)
+        
+        # Enhance with textbook images if available
+        if self.image_extractor:
+            images = self.image_extractor.find_images_for_topic(q.get('topic', ''))
+            formatted_response["textbook_images"] = [
+                {
+                    "path": os.path.basename(img['path']),
+                    "page": img['page'],
+                    "context": img['context'][:200] + "...",
+                    "relevance": round(img['score'], 2)
+                } for img in images[:2]  # Get top 2 images
+            ]
+        
+        return formatted_response
+
     def _build_prompt(self, question_data: Dict, style: str) -> str:
         """Construct the generation prompt"""
         return f"""
@@ -119,8 +135,7 @@ Generate content in EXACTLY this format:
         
         try:
             # Extract sections
-            section_pattern = r'### ([A-Z_]+)\s*\n([\s\S]+?)(?=\n### |\Z)'
-            sections = dict(re.findall(section_pattern, response))
+            sections = self._split_sections(response)
             
             # Fill result fields
             result["question"] = sections.get('QUESTION', '').strip()
@@ -128,19 +143,16 @@ Generate content in EXACTLY this format:
             bloom_section = sections.get('BLOOM_LEVEL', '')
             if bloom_section:
                 result["bloom_level"] = bloom_section.split()[0]
-                marks_match = re.search(r'MARKS:\s*(\d+)', bloom_section)
+                marks_match = _MARKS_RE.search(bloom_section)
                 if marks_match:
                     result["marks"] = int(marks_match.group(1))
             
             result["content"] = sections.get('CONTENT', '').strip()
-            result["keywords"] = re.findall(r'\*\*(\w+)\*\*', result["content"])
+            result["keywords"] = _KEYWORD_RE.findall(result["content"])
             
             # Parse visual suggestions
             visuals_text = sections.get('VISUALS', '')
-            visual_matches = re.finditer(
-                r'(\d+)\. TYPE:\s*(\w+)\s*PURPOSE:\s*(.+)', 
-                visuals_text
-            )
+            visual_matches = _VISUAL_RE.finditer(visuals_text)
             result["visual_suggestions"] = [
                 {"type": m.group(2), "purpose": m.group(3).strip()}
                 for m in visual_matches
@@ -152,6 +164,21 @@ Generate content in EXACTLY this format:
         
         return result
 
+    @staticmethod
+    def _split_sections(response: str) -> Dict[str, str]:
+        """
+        {name: stripped body} of the "### NAME" sections in a response, found
+        by splitting on the headers in one linear pass; text before the first
+        header is ignored, and a repeated section keeps its last body
+        """
+        sections = {}
+        for part in ("\n" + response).split("\n### ")[1:]:
+            head, _, body = part.partition("\n")
+            name = head.strip()
+            if _SECTION_NAME_RE.fullmatch(name):
+                sections[name] = body.strip()
+        return sections
+
     def _call_openrouter(self, prompt: str) -> str:
         """Call OpenRouter API with error handling"""
         payload = {
@@ -164,9 +191,9 @@ Generate content in EXACTLY this format:
         }
 
         try:
-            res = requests.post(self.api_url, headers=self.headers, json=payload, timeout=30)
+            res = self._session.post(self.api_url, json=payload, timeout=30)
             res.raise_for_status()
-            return res.json()["choices"][0]["message"]["content"].strip()
+            return openrouter_json(res)["choices"][0]["message"]["content"].strip()
         except Exception as e:
             print(f"❌ API call failed: {str(e)}")
             raise
@@ -1,16 +1,35 @@
+import json
 import requests
 import random
 import os
+import re
+import yaml
+from concurrent.futures import ThreadPoolExecutor
 from jinja2 import Template
 from dotenv import load_dotenv
 from typing import Dict, List
 from .bloom_mapper import get_chunk
 from .bloom_config import BLOOM_CONFIG
-from .answer_gen import AnswerGenerator
+from .answer_gen import AnswerGenerator, openrouter_json, openrouter_session
 
 # Load environment variables
 load_dotenv()
 
+# Common AI model artifacts stripped from questions; where two match at the
+# same place, the earlier one wins
+_ARTIFACTS = (
+    "<s>", "</s>", "[OUT]", "[/OUT]", "<s> [OUT]", "[/OUT] </s>",
+    "**Question:**", "**Question (", "Question:", "Question (",
+    "<|im_start|>", "<|im_end|>", "[INST]", "[/INST]"
+)
+# All artifacts in one pass over the question
+_ARTIFACT_RE = re.compile("|".join(map(re.escape, _ARTIFACTS)))
+_TAG_RE = re.compile(r'<[^>]+>')
+_BRACKET_RE = re.compile(r'\[[^\]]+\]')
+_BOLD_RE = re.compile(r'\*\*([^*]+)\*\*')
+_ITAL_RE = re.compile(r'\*([^*]+)\*')
+_WS_RE = re.compile(r'\s+')
+
 class QuestionGenerator:
     def __init__(self, 
                  prompt_path: str = "generation/question_generation/prompt_engine/prompts.yaml",
@@ -30,12 +49,15 @@ class QuestionGenerator:
             "Content-Type": "application/json"
         }
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+        # Keep-alive session shared by the topic worker threads
+        self._session = openrouter_session(self.headers)
 
         with open(prompt_path) as f:
-            import yaml
             self.prompt_templates = yaml.safe_load(f)
 
         self.bloom_config = BLOOM_CONFIG
+        # Level names in config order, for the weighted draw in select_bloom_level
+        self._bloom_levels = list(self.bloom_config)
         self.answer_generator = AnswerGenerator(api_key=api_key, model=model)
 
     def _call_openrouter(self, prompt: str) -> str:
@@ -48,20 +70,20 @@ class QuestionGenerator:
         }
 
         try:
-            res = requests.post(self.api_url, headers=self.headers, json=payload, timeout=60)
+            res = self._session.post(self.api_url, json=payload, timeout=60)
 
             if res.status_code != 200:
                 print("ERROR: OpenRouter Error Response:")
                 print(res.status_code, res.text)
                 raise Exception(f"OpenRouter error: {res.status_code}")
 
-            data = res.json()
+            data = openrouter_json(res)
             return data["choices"][0]["message"]["content"].strip()
 
         except requests.exceptions.Timeout:
             print("TIMEOUT: API call timed out after 60 seconds")
             raise Exception("API timeout - try again later")
-        except requests.exceptions.JSONDecodeError:
+        except json.JSONDecodeError:
             print("ERROR: Failed to decode JSON. Raw response:")
             print(res.text)
             raise Exception("OpenRouter response was not valid JSON.")
@@ -70,7 +92,12 @@ class QuestionGenerator:
             raise
 
 
-    def generate_question(self, topic: str, content: str, keywords: List[str]) -> Dict:
+    def generate_question(self, topic: str, content: str, keywords: List[str], with_answer: bool = True) -> Dict:
+        """
+        Generate one question for the topic. With with_answer=False the
+        "answer" is left as None, for the caller to fill in (see
+        generate_for_topics, which answers all kept questions in one batch).
+        """
         bloom_level = self.select_bloom_level(len(content))
         possible_marks = self.bloom_config[bloom_level]["marks"]
         marks = random.choice(possible_marks)
@@ -107,7 +134,9 @@ class QuestionGenerator:
             raise ValueError("question_generation_failed")
 
         # Generate answer for the question
-        answer_text = self.answer_generator.generate_answer(question_text, chunk, bloom_level, marks)
+        answer_text = None
+        if with_answer:
+            answer_text = self.answer_generator.generate_answer(question_text, chunk, bloom_level, marks)
 
         # Use available keywords (should not be empty due to skip logic above)
         max_keywords = min(len(keywords), 2 if marks < 5 else 3)
@@ -128,29 +157,19 @@ class QuestionGenerator:
 
     def _clean_question(self, text: str) -> str:
         """Clean and format the generated question"""
-        text = text.strip()
-        
         # Remove common AI model artifacts
-        artifacts_to_remove = [
-            "<s>", "</s>", "[OUT]", "[/OUT]", "<s> [OUT]", "[/OUT] </s>",
-            "**Question:**", "**Question (", "Question:", "Question (",
-            "<|im_start|>", "<|im_end|>", "[INST]", "[/INST]"
-        ]
-        
-        for artifact in artifacts_to_remove:
-            text = text.replace(artifact, "").strip()
+        text = _ARTIFACT_RE.sub('', text)
         
         # Remove any remaining XML-like tags
-        import re
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'\[[^\]]+\]', '', text)
+        text = _TAG_RE.sub('', text)
+        text = _BRACKET_RE.sub('', text)
         
         # Remove markdown formatting
-        text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Remove bold
-        text = re.sub(r'\*([^*]+)\*', r'\1', text)      # Remove italic
+        text = _BOLD_RE.sub(r'\1', text)  # Remove bold
+        text = _ITAL_RE.sub(r'\1', text)  # Remove italic
         
         # Clean up extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WS_RE.sub(' ', text).strip()
         
         # If the text is too short or looks like an artifact, return a default
         if len(text) < 10 or text.startswith('<') or text.startswith('['):
@@ -177,39 +196,62 @@ class QuestionGenerator:
             return random.choice(["Remember", "Understand", "Apply"])
         else:
             weights = [1, 2, 3, 4, 2, 1]
-            return random.choices(list(self.bloom_config.keys()), weights=weights, k=1)[0]
+            return random.choices(self._bloom_levels, weights=weights, k=1)[0]
+
+    def _generate_topic_candidates(self, first_number: int, topic: str, content: str, keywords: List[str], questions_per_topic: int) -> List[Dict]:
+        """Generate up to questions_per_topic unanswered questions for one topic, before duplicate filtering."""
+        candidates = []
+        for i in range(questions_per_topic):
+            current_question = first_number + i
+            
+            try:
+                # Skip if no keywords available
+                if not keywords or len(keywords) == 0:
+                    print(f"SKIP: No keywords available for topic: {topic[:30]}...")
+                    continue
+                
+                # Add variety by shuffling keywords and adding randomness
+                shuffled_keywords = keywords.copy()
+                random.shuffle(shuffled_keywords)
+                
+                # Use different keyword subsets for variety
+                if len(keywords) > 2:
+                    keyword_subset = random.sample(keywords, min(len(keywords), random.randint(2, 4)))
+                else:
+                    keyword_subset = keywords
+                
+                
+                candidates.append(self.generate_question(topic, content, keyword_subset, with_answer=False))
+            except Exception as e:
+                print(f"ERROR: Failed to generate question {current_question}: {e}")
+                # Continue with next question instead of stopping
+                continue
+        return candidates
 
-    def generate_for_topics(self, topics: Dict[str, str], keywords_dict: Dict[str, List[str]], questions_per_topic: int = 3) -> List[Dict]:
+    def generate_for_topics(self, topics: Dict[str, str], keywords_dict: Dict[str, List[str]], questions_per_topic: int = 3, max_workers: int = None) -> List[Dict]:
+        """
+        Generate questions for every topic. Topics are generated concurrently
+        (the work is waiting on OpenRouter); duplicates are then filtered in
+        topic order, so the result is ordered as if generated one by one.
+        Answers are generated afterwards in one concurrent batch, only for
+        the questions that were kept.
+        """
         questions = []
-        total_questions = len(topics) * questions_per_topic
-        current_question = 0
         generated_questions = set()  # Track generated questions to avoid duplicates
+        if not topics:
+            return questions
         
-        for topic, content in topics.items():
-            keywords = keywords_dict.get(topic, [])
-            
-            for i in range(questions_per_topic):
-                current_question += 1
-                
-                try:
-                    # Skip if no keywords available
-                    if not keywords or len(keywords) == 0:
-                        print(f"SKIP: No keywords available for topic: {topic[:30]}...")
-                        continue
-                    
-                    # Add variety by shuffling keywords and adding randomness
-                    shuffled_keywords = keywords.copy()
-                    random.shuffle(shuffled_keywords)
-                    
-                    # Use different keyword subsets for variety
-                    if len(keywords) > 2:
-                        keyword_subset = random.sample(keywords, min(len(keywords), random.randint(2, 4)))
-                    else:
-                        keyword_subset = keywords
-                    
-                    
-                    question = self.generate_question(topic, content, keyword_subset)
-                    
+        with ThreadPoolExecutor(max_workers=max_workers or min(8, len(topics))) as executor:
+            futures = [
+                executor.submit(
+                    self._generate_topic_candidates,
+                    topic_idx * questions_per_topic + 1, topic, content,
+                    keywords_dict.get(topic, []), questions_per_topic
+                )
+                for topic_idx, (topic, content) in enumerate(topics.items())
+            ]
+            for future in futures:
+                for question in future.result():
                     # Simple duplicate check - skip if very similar question exists
                     question_lower = question['question'].lower().strip()
                     if any(question_lower in existing or existing in question_lower 
@@ -219,8 +261,10 @@ class QuestionGenerator:
                     
                     generated_questions.add(question_lower)
                     questions.append(question)
-                except Exception as e:
-                    print(f"ERROR: Failed to generate question {current_question}: {e}")
-                    # Continue with next question instead of stopping
-                    continue
-        return questions
\ No newline at end of file
+
+        answers = self.answer_generator.generate_answers([
+            (q["question"], q["chunk"], q["bloom"], q["marks"]) for q in questions
+        ])
+        for question, answer in zip(questions, answers):
+            question["answer"] = answer
+        return questions
@@ -3,21 +3,41 @@ DOCX Text Extraction Module
 Extracts topic-wise text from DOCX files using headings
 """
 
+import hashlib
+import io
 import re
 import os
+import struct
 from collections import OrderedDict
-from typing import OrderedDict as OrderedDictType, List, Dict, Optional
+from functools import lru_cache
+from typing import OrderedDict as OrderedDictType, Iterator, List, Dict, Optional, Tuple
 from docx import Document
 from pathlib import Path
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
+
+# Header patterns, compiled once; see is_topic_header and clean_header
+_NUMBERED_HEADER_RE = re.compile(r"^\d+(\.\d+)*\s+.+$")
+_NUMBER_RE = re.compile(r'^\d+$')
+_DOTTED_NUMBER_RE = re.compile(r"^\d+(?:\.\d+)*\.\s")
+_DOTTED_NUMBER_SUB_RE = re.compile(r"^(\d+(?:\.\d+)*)(\.)\s+")
+_WS_RE = re.compile(r"\s+")
+_SECTION_TITLE_RE = re.compile(r"^(\d+(?:\.\d+)*)(?:\.)?\s+(.+)$")
+
+
+# Headers repeat (contents pages, running headers), so both header helpers
+# are memoized on the line's text
+@lru_cache(maxsize=4096)
 def is_topic_header(text: str) -> bool:
     """Return True if the line looks like a topic header."""
     text = text.strip()
     
     # Pattern 1: Numbered headers like "1.1 Title"
-    numbered_pattern = r"^\d+(\.\d+)*\s+.+$"
-    if re.match(numbered_pattern, text):
+    if _NUMBERED_HEADER_RE.match(text):
         return True
     
     # Pattern 2: Topic-based headers (all caps, short phrases)
@@ -29,12 +49,13 @@ def is_topic_header(text: str) -> bool:
         not '=' in text and  # Not a mathematical expression
         not text.startswith('Fig:') and  # Not a figure caption
         not text.startswith('Table:') and  # Not a table caption
-        not re.match(r'^\d+$', text)):  # Not just a number
+        not _NUMBER_RE.match(text)):  # Not just a number
         return True
     
     return False
 
 
+@lru_cache(maxsize=4096)
 def clean_header(text: str) -> str:
     """
     Cleans section headers.
@@ -45,14 +66,14 @@ def clean_header(text: str) -> str:
     text = text.strip()
 
     # Handle numbered headers
-    if re.match(r"^\d+(?:\.\d+)*\.\s", text):
+    if _DOTTED_NUMBER_RE.match(text):
         # Fix common issue: '1.1.' → '1.1'
-        text = re.sub(r"^(\d+(?:\.\d+)*)(\.)\s+", r"\1 ", text)
+        text = _DOTTED_NUMBER_SUB_RE.sub(r"\1 ", text)
     else:
-        text = re.sub(r"\s+", " ", text)  # remove weird extra spaces
+        text = _WS_RE.sub(" ", text)  # remove weird extra spaces
 
     # For numbered headers, parse section number and title
-    numbered_match = re.match(r"^(\d+(?:\.\d+)*)(?:\.)?\s+(.+)$", text)
+    numbered_match = _SECTION_TITLE_RE.match(text)
     if numbered_match:
         section_number, title = numbered_match.groups()
         return f"{section_number} {title.strip()}"
@@ -61,6 +82,75 @@ def clean_header(text: str) -> str:
     return text
 
 
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers, which carry the image size (C4, C8 and CC are
+# other segments in the same range)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _header_size(image_data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) read from a PNG or JPEG header, or None for other data."""
+    if image_data.startswith(_PNG_SIGNATURE) and image_data[12:16] == b"IHDR":
+        return struct.unpack(">II", image_data[16:24])
+    if image_data.startswith(b"\xff\xd8"):
+        i = 2
+        while i + 9 <= len(image_data) and image_data[i] == 0xFF:
+            marker = image_data[i + 1]
+            if marker == 0xFF:  # fill byte
+                i += 1
+                continue
+            if marker in _JPEG_SOF_MARKERS:
+                height, width = struct.unpack(">HH", image_data[i + 5:i + 9])
+                return width, height
+            if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # markers without a length
+                i += 2
+                continue
+            i += 2 + struct.unpack(">H", image_data[i + 2:i + 4])[0]
+    return None
+
+
+def _image_size(image_data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) of an embedded image, or None if it cannot be read.
+    PNG and JPEG sizes come straight from the header; anything else is
+    opened with PIL (headers only, nothing is decoded) when it is installed.
+    """
+    size = _header_size(image_data)
+    if size is not None or Image is None:
+        return size
+    try:
+        with Image.open(io.BytesIO(image_data)) as img_obj:
+            return img_obj.size
+    except Exception:
+        return None
+
+
+def _joined(content: OrderedDictType[str, List[str]]) -> OrderedDictType[str, str]:
+    """Each topic's collected lines joined into its text, in topic order."""
+    return OrderedDict((topic, "".join(lines)) for topic, lines in content.items())
+
+
+def _text_lines(doc) -> Iterator[str]:
+    """
+    Yield the lines of the document's text, with heading-styled paragraphs
+    prefixed "HEADING: ". Empty paragraphs are skipped; a paragraph with line
+    breaks gives one line per break. Like splitting the whole text, this ends
+    with one empty line.
+    """
+    for paragraph in doc.paragraphs:
+        text = paragraph.text.strip()
+        if text:
+            # Check if this is a heading (style-based detection)
+            style_name = paragraph.style.name if paragraph.style else "Normal"
+            is_heading = "Heading" in style_name or "Title" in style_name
+            
+            if is_heading:
+                # Add heading marker to make it easier to detect
+                text = f"HEADING: {text}"
+            yield from text.split("\n")
+    yield ""
+
+
 def extract_topics(docx_path: str) -> OrderedDictType[str, str]:
     """
     Extract topic-wise text from a DOCX file.
@@ -69,7 +159,8 @@ def extract_topics(docx_path: str) -> OrderedDictType[str, str]:
     subsequent lines into the current topic until the next header.
     Returns an OrderedDict to preserve section order.
     """
-    content: OrderedDictType[str, str] = OrderedDict()
+    # Each topic's lines are collected in a list and joined once at the end
+    content: OrderedDictType[str, List[str]] = OrderedDict()
     current_topic: str = ""
 
     doc = Document(docx_path)
@@ -80,12 +171,12 @@ def extract_topics(docx_path: str) -> OrderedDictType[str, str]:
         if is_topic_header(text):
             current_topic = clean_header(text)
             if current_topic not in content:
-                content[current_topic] = ""
+                content[current_topic] = []
         elif current_topic:
             # Accumulate text under current topic
-            content[current_topic] += text + "\n"
+            content[current_topic].append(text + "\n")
 
-    return content
+    return _joined(content)
 
 
 def extract_topics_with_images(docx_path: str, output_dir: str = "answer_key_gen") -> tuple[OrderedDictType[str, str], Dict[str, List[Dict]]]:
@@ -96,7 +187,7 @@ def extract_topics_with_images(docx_path: str, output_dir: str = "answer_key_gen
         - topics: OrderedDict of topic -> content
         - topic_images: Dict of topic -> list of associated images
     """
-    content: OrderedDictType[str, str] = OrderedDict()
+    content: OrderedDictType[str, List[str]] = OrderedDict()
     topic_images: Dict[str, List[Dict]] = {}
     current_topic: str = ""
     
@@ -106,46 +197,30 @@ def extract_topics_with_images(docx_path: str, output_dir: str = "answer_key_gen
     
     doc = Document(docx_path)
     
-    # First pass: extract text and identify topics
+    # First pass: extract text and identify topics, line by line as the
+    # paragraphs are read
     header_count = 0
     
-    # Extract all text from DOCX, including headings
-    all_text = ""
-    for paragraph in doc.paragraphs:
-        text = paragraph.text.strip()
-        if text:
-            # Check if this is a heading (style-based detection)
-            style_name = paragraph.style.name if paragraph.style else "Normal"
-            is_heading = "Heading" in style_name or "Title" in style_name
-            
-            if is_heading:
-                # Add heading marker to make it easier to detect
-                all_text += f"HEADING: {text}\n"
-            else:
-                all_text += text + "\n"
-    
-    # Process line by line
-    lines = all_text.split("\n")
-    
-    for line in lines:
+    for line in _text_lines(doc):
         # Check for heading markers first
         if line.startswith("HEADING:"):
             heading_text = line.replace("HEADING:", "").strip()
             if is_topic_header(heading_text):
                 current_topic = clean_header(heading_text)
                 if current_topic not in content:
-                    content[current_topic] = ""
+                    content[current_topic] = []
                     topic_images[current_topic] = []
                     header_count += 1
         elif is_topic_header(line):
             current_topic = clean_header(line)
             if current_topic not in content:
-                content[current_topic] = ""
+                content[current_topic] = []
                 topic_images[current_topic] = []
                 header_count += 1
         elif current_topic:
             # Accumulate text under current topic
-            content[current_topic] += line + "\n"
+            content[current_topic].append(line + "\n")
+    content = _joined(content)
     
     # Second pass: extract images and associate with proper topics
     image_count = 0
@@ -160,6 +235,10 @@ def extract_topics_with_images(docx_path: str, output_dir: str = "answer_key_gen
                     not t.startswith('FIND-') and
                     len(t) > 5]  # Not too short
     
+    # Digests of the images already taken, so an image embedded more than once
+    # (logos, running headers) is sized, uploaded and assigned only once
+    seen_images = set()
+    
     for rel in doc.part.rels.values():
         if "image" in rel.target_ref:
             try:
@@ -170,23 +249,19 @@ def extract_topics_with_images(docx_path: str, output_dir: str = "answer_key_gen
                 if len(image_data) < 20000:  # Skip images smaller than 20KB
                     continue
                 
+                digest = hashlib.blake2b(image_data, digest_size=16).digest()
+                if digest in seen_images:
+                    continue
+                seen_images.add(digest)
+                
                 # Try to get actual image dimensions to filter out text snippets
-                try:
-                    from PIL import Image
-                    import io
-                    img_obj = Image.open(io.BytesIO(image_data))
-                    width, height = img_obj.size
-                    
-                    # Skip images that are too small (likely text snippets or icons)
-                    if width < 200 or height < 200:
-                        continue
-                        
-                    # Update size with actual dimensions
-                    actual_size = (width, height)
-                    img_obj.close()
-                except:
+                actual_size = _image_size(image_data)
+                if actual_size is None:
                     # If we can't get dimensions, use default size
                     actual_size = (200, 200)
+                elif actual_size[0] < 200 or actual_size[1] < 200:
+                    # Skip images that are too small (likely text snippets or icons)
+                    continue
                 
                 # Save image with topic-based naming
                 img_filename = f"diagram_{image_count}.png"
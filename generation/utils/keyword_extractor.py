@@ -7,7 +7,9 @@ import spacy
 class KeywordExtractor:
     def __init__(self, model_name: str = "all-MiniLM-L6-v2", spacy_model: str = "en_core_web_sm"):
         self.bert_model = KeyBERT(model_name)
-        self.nlp = spacy.load(spacy_model)
+        # Only part-of-speech tags are read, so the parser, NER and lemmatizer are skipped
+        self.nlp = spacy.load(spacy_model, disable=["parser", "ner", "lemmatizer"])
+        self.stop_words = self.nlp.Defaults.stop_words
 
     def extract_keywords(self, text: str, top_n: int = 5) -> List[str]:
         """Extract keywords using KeyBERT with spaCy filtering."""
@@ -18,13 +20,13 @@ class KeywordExtractor:
             top_n=top_n * 2,
         )
 
-        doc = self.nlp(text)
         valid_pos = {"NOUN", "PROPN"}
         filtered_keywords: List[str] = []
 
-        for kw, _ in keywords:
-            tokens = [token for token in self.nlp(kw) if token.pos_ in valid_pos]
-            if tokens and any(token.text.lower() not in self.nlp.Defaults.stop_words for token in tokens):
+        # Candidate phrases are tagged as one batch
+        for (kw, _), kw_doc in zip(keywords, self.nlp.pipe(kw for kw, _ in keywords)):
+            tokens = [token for token in kw_doc if token.pos_ in valid_pos]
+            if tokens and any(token.text.lower() not in self.stop_words for token in tokens):
                 filtered_keywords.append(kw)
 
         return filtered_keywords[:top_n]
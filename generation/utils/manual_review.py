@@ -1,10 +1,8 @@
 # src/evaluation/manual_review.py
 import json
 
-def review_questions(question_file):
-    with open(question_file) as f:
-        questions = json.load(f)
-    
+def review_question_list(questions):
+    """Interactively approve/reject/edit questions in place and return the list."""
     for i, q in enumerate(questions):
         print(f"\n--- Question {i+1}/{len(questions)} ---")
         print(f"**{q['bloom']} ({q['marks']} marks)**")
@@ -21,6 +19,13 @@ def review_questions(question_file):
             q['feedback'] = input("Feedback: ")
         else:
             q['approved'] = False  # Default to reject for invalid input
+    return questions
+
+def review_questions(question_file):
+    with open(question_file) as f:
+        questions = json.load(f)
+    
+    review_question_list(questions)
     
     # Save updated questions back to file
     with open(question_file, "w") as f:
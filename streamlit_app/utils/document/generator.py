@@ -1,7 +1,6 @@
 """Document generation utilities"""
 import streamlit as st
-import json
-import os
+from io import BytesIO
 from pathlib import Path
 
 # Import storage client for persistent file operations
@@ -20,7 +19,8 @@ def save_questions_to_file():
     """Save questions back to the intermediate file"""
     try:
         if 'generated_questions' in st.session_state:
-            intermediate_path_str = "answer_key_gen/intermediate_questions.json"
+            # Same path and gzipped encoding as the snapshot the pipeline writes
+            from generation.pipeline import _INTERMEDIATE_JSON_PATH, _json_bytes, _json_gz_bytes
             
             # Save to Azure blob storage ONLY
             if not _storage_available:
@@ -34,7 +34,8 @@ def save_questions_to_file():
                     return
                 
                 # Save directly to blob storage
-                storage.write_json(intermediate_path_str, st.session_state.generated_questions)
+                json_bytes = _json_bytes(st.session_state.generated_questions)
+                storage.write_file(_INTERMEDIATE_JSON_PATH, _json_gz_bytes(json_bytes))
                 return
             except Exception as e:
                 st.error(f"❌ Failed to save to blob storage: {str(e)}")
@@ -100,7 +101,7 @@ def generate_final_documents():
         # Generate documents directly (no subprocess)
         try:
             # Import and use your existing document generation
-            from generation.pipeline import save_question_paper_to_docx, save_to_docx
+            from generation.pipeline import save_documents
             
             # Load approved questions from Azure blob storage ONLY
             questions = None
@@ -132,53 +133,32 @@ def generate_final_documents():
             question_paper_path_str = "answer_key_gen/question_paper.docx"
             answer_key_path_str = "answer_key_gen/final_answer_key.docx"
             
-            # For document generation, we need local temp files first
-            # Then upload to blob storage
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_qp:
-                temp_qp_path = tmp_qp.name
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_ak:
-                temp_ak_path = tmp_ak.name
+            # Generate in memory, then upload to blob storage
+            qp_buf, ak_buf = BytesIO(), BytesIO()
+            save_documents(questions, ak_buf, qp_buf)
+            
+            # Upload to Azure blob storage ONLY
+            if not _storage_available:
+                st.error("❌ Storage client not available. Please configure Azure storage.")
+                return
             
             try:
-                # Generate to temp files
-                save_question_paper_to_docx(questions, temp_qp_path)
-                save_to_docx(questions, temp_ak_path, None)
-                
-                # Upload to Azure blob storage ONLY
-                if not _storage_available:
-                    st.error("❌ Storage client not available. Please configure Azure storage.")
+                storage = get_storage_client()
+                if not storage.is_blob_storage():
+                    st.error("❌ Blob storage is not configured. Please configure Azure storage.")
                     return
                 
-                try:
-                    storage = get_storage_client()
-                    if not storage.is_blob_storage():
-                        st.error("❌ Blob storage is not configured. Please configure Azure storage.")
-                        return
-                    
-                    # Read temp files and upload to blob
-                    with open(temp_qp_path, 'rb') as f:
-                        storage.write_file(question_paper_path_str, f.read())
-                    with open(temp_ak_path, 'rb') as f:
-                        storage.write_file(answer_key_path_str, f.read())
-                    # Store blob paths in session state
-                    question_paper_path = question_paper_path_str
-                    answer_key_path = answer_key_path_str
-                except Exception as e:
-                    st.error(f"❌ Failed to save documents to blob storage: {str(e)}")
-                    import traceback
-                    with st.expander("🔍 Error Details", expanded=False):
-                        st.code(traceback.format_exc())
-                    return
-            finally:
-                # Clean up temp files
-                try:
-                    if os.path.exists(temp_qp_path):
-                        os.unlink(temp_qp_path)
-                    if os.path.exists(temp_ak_path):
-                        os.unlink(temp_ak_path)
-                except:
-                    pass
+                storage.write_file(question_paper_path_str, qp_buf.getvalue())
+                storage.write_file(answer_key_path_str, ak_buf.getvalue())
+                # Store blob paths in session state
+                question_paper_path = question_paper_path_str
+                answer_key_path = answer_key_path_str
+            except Exception as e:
+                st.error(f"❌ Failed to save documents to blob storage: {str(e)}")
+                import traceback
+                with st.expander("🔍 Error Details", expanded=False):
+                    st.code(traceback.format_exc())
+                return
             
             # Step 4: Complete
             status_text.text("✅ Documents generated successfully!")
@@ -1,8 +1,5 @@
 """Evaluation results display components"""
 import streamlit as st
-import json
-import tempfile
-import os
 from pathlib import Path
 import sys
 import zipfile
@@ -296,39 +293,16 @@ def generate_evaluation_report():
             # Get results from session state
             results = st.session_state.evaluation_results
             
-            # Create a temporary JSON file for the report generator
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as tmp_file:
-                json.dump(results, tmp_file, indent=2, ensure_ascii=False)
-                tmp_results_path = tmp_file.name
+            # Generate the DOCX report in memory straight from the results
+            report_content = generate_docx_report(results, output_path=None)
             
-            try:
-                # Create a temporary output file for the DOCX report
-                with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp_output:
-                    tmp_report_path = tmp_output.name
-                
-                # Generate the DOCX report using the detailed report generator
-                generate_docx_report(tmp_results_path, tmp_report_path)
-                
-                # Read the generated DOCX report as binary
-                with open(tmp_report_path, 'rb') as f:
-                    report_content = f.read()
-                
-                # Store in session state for persistence
-                st.session_state.evaluation_report_content = report_content
-                st.session_state.evaluation_report_filename = "evaluation_report.docx"
-                
-                # Success message
-                st.success("✅ Detailed evaluation report generated successfully!")
-                st.rerun()
-                
-            finally:
-                # Clean up temporary files
-                try:
-                    os.unlink(tmp_results_path)
-                    if os.path.exists(tmp_report_path):
-                        os.unlink(tmp_report_path)
-                except:
-                    pass
+            # Store in session state for persistence
+            st.session_state.evaluation_report_content = report_content
+            st.session_state.evaluation_report_filename = "evaluation_report.docx"
+            
+            # Success message
+            st.success("✅ Detailed evaluation report generated successfully!")
+            st.rerun()
             
         except ImportError as e:
             st.error(f"❌ Error importing report generator: {str(e)}")
@@ -349,76 +323,36 @@ def generate_individual_student_reports():
             all_results = st.session_state.all_evaluation_results
             num_students = len(all_results)
             
-            # Create a temporary directory for reports
-            temp_dir = tempfile.mkdtemp()
             report_files = {}
             
-            try:
-                # Generate a DOCX report for each student
-                for student_idx, results in enumerate(all_results, start=1):
-                    student_name = results.get('student_name', f'Student_{student_idx}')
-                    student_filename = results.get('student_filename', 'Unknown')
-                    
-                    # Clean filename - remove special characters and use student name
-                    safe_name = "".join(c for c in student_name if c.isalnum() or c in (' ', '-', '_')).strip()
-                    if not safe_name:
-                        safe_name = f"Student_{student_idx}"
-                    
-                    # Create temporary JSON file for this student
-                    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8', dir=temp_dir) as tmp_json:
-                        json.dump(results, tmp_json, indent=2, ensure_ascii=False)
-                        tmp_json_path = tmp_json.name
-                    
-                    # Generate DOCX report for this student
-                    report_filename = f"{safe_name}.docx"
-                    report_path = os.path.join(temp_dir, report_filename)
-                    
-                    generate_docx_report(tmp_json_path, report_path)
-                    
-                    # Read the generated DOCX file into memory
-                    with open(report_path, 'rb') as f:
-                        report_content = f.read()
-                    
-                    report_files[report_filename] = report_content
-                    
-                    # Clean up temporary JSON file
-                    try:
-                        os.unlink(tmp_json_path)
-                    except:
-                        pass
-                
-                # Store individual reports in session state
-                st.session_state.individual_reports = report_files
+            # Generate a DOCX report for each student, kept in memory
+            for student_idx, results in enumerate(all_results, start=1):
+                student_name = results.get('student_name', f'Student_{student_idx}')
                 
-                # If more than 10 files, also create ZIP file
-                if num_students > 10:
-                    zip_buffer = io.BytesIO()
-                    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                        for filename, filepath in [(f, os.path.join(temp_dir, f)) for f in report_files.keys()]:
-                            if os.path.exists(filepath):
-                                zip_file.write(filepath, filename)
-                    
-                    zip_buffer.seek(0)
-                    zip_content = zip_buffer.read()
-                    
-                    # Store ZIP in session state
-                    st.session_state.individual_reports_zip = zip_content
-                    st.session_state.individual_reports_zip_filename = "student_reports.zip"
+                # Clean filename - remove special characters and use student name
+                safe_name = "".join(c for c in student_name if c.isalnum() or c in (' ', '-', '_')).strip()
+                if not safe_name:
+                    safe_name = f"Student_{student_idx}"
                 
-                # Rerun to show download buttons
-                st.rerun()
+                report_filename = f"{safe_name}.docx"
+                report_files[report_filename] = generate_docx_report(results, output_path=None)
+            
+            # Store individual reports in session state
+            st.session_state.individual_reports = report_files
+            
+            # If more than 10 files, also create ZIP file
+            if num_students > 10:
+                zip_buffer = io.BytesIO()
+                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                    for filename, report_content in report_files.items():
+                        zip_file.writestr(filename, report_content)
                 
-            finally:
-                # Clean up temporary files
-                try:
-                    for filename in report_files.keys():
-                        filepath = os.path.join(temp_dir, filename)
-                        if os.path.exists(filepath):
-                            os.unlink(filepath)
-                    if os.path.exists(temp_dir):
-                        os.rmdir(temp_dir)
-                except:
-                    pass
+                # Store ZIP in session state
+                st.session_state.individual_reports_zip = zip_buffer.getvalue()
+                st.session_state.individual_reports_zip_filename = "student_reports.zip"
+            
+            # Rerun to show download buttons
+            st.rerun()
             
         except ImportError as e:
             st.error(f"❌ Error importing report generator: {str(e)}")
@@ -438,45 +372,28 @@ def generate_multi_student_evaluation_report():
             # Get all results from session state
             all_results = st.session_state.all_evaluation_results
             
-            # Create a temporary output file for the DOCX report
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp_output:
-                tmp_report_path = tmp_output.name
+            # Generate the multi-student DOCX report in memory
+            report_content = generate_multi_student_docx_report(all_results, output_path=None)
+            
+            # Store in session state for immediate download
+            st.session_state.multi_student_report_content = report_content
+            st.session_state.multi_student_report_filename = "evaluation_report_all_students.docx"
             
+            # Save to Azure blob storage for backup
             try:
-                # Generate the multi-student DOCX report
-                generate_multi_student_docx_report(all_results, tmp_report_path)
-                
-                # Read the generated DOCX report as binary
-                with open(tmp_report_path, 'rb') as f:
-                    report_content = f.read()
-                
-                # Store in session state for immediate download
-                st.session_state.multi_student_report_content = report_content
-                st.session_state.multi_student_report_filename = "evaluation_report_all_students.docx"
-                
-                # Save to Azure blob storage for backup
-                try:
-                    from storage import get_storage_client
-                    storage = get_storage_client()
-                    
-                    if storage.is_blob_storage():
-                        blob_path = "evaluation_reports/combined_report_all_students.docx"
-                        storage.write_file(blob_path, report_content)
-                        st.session_state.multi_student_report_blob_path = blob_path
-                except Exception as e:
-                    # If Azure save fails, continue with session state only
-                    pass
-                
-                # Rerun to show download button
-                st.rerun()
+                from storage import get_storage_client
+                storage = get_storage_client()
                 
-            finally:
-                # Clean up temporary files
-                try:
-                    if os.path.exists(tmp_report_path):
-                        os.unlink(tmp_report_path)
-                except:
-                    pass
+                if storage.is_blob_storage():
+                    blob_path = "evaluation_reports/combined_report_all_students.docx"
+                    storage.write_file(blob_path, report_content)
+                    st.session_state.multi_student_report_blob_path = blob_path
+            except Exception as e:
+                # If Azure save fails, continue with session state only
+                pass
+            
+            # Rerun to show download button
+            st.rerun()
             
         except ImportError as e:
             st.error(f"❌ Error importing report generator: {str(e)}")
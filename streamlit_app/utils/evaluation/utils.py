@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import hashlib
 import json
 import tempfile
 import subprocess
@@ -28,6 +29,24 @@ def check_file_size_limit(uploaded_file, max_size_mb: float = 50.0) -> bool:
     file_size_mb = uploaded_file.size / (1024 * 1024)
     return file_size_mb <= max_size_mb
 
+def _file_digest(path):
+    """Content hash of a file; temp-file paths change every run, contents do not"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_evaluation(_student_path, _answer_key_path, student_digest, answer_key_digest):
+    """Evaluate converted JSON files; keyed on content digests (underscored paths are not hashed)"""
+    from evaluator.answer_evaluator import evaluate_from_json_files
+    return evaluate_from_json_files(_student_path, _answer_key_path)
+
+def evaluate_json_files_cached(student_path, answer_key_path):
+    """Run evaluate_from_json_files, reusing results when the same files are submitted again"""
+    return _cached_evaluation(
+        student_path, answer_key_path,
+        _file_digest(student_path), _file_digest(answer_key_path)
+    )
+
 def process_answer_evaluation(answer_key_file, student_answer_file):
     """Process answer evaluation with progress tracking"""
     try:
@@ -175,9 +194,8 @@ def process_multiple_student_evaluations(answer_key_file, student_answer_files):
                 if not converted_student_path:
                     continue
                 
-                # Run evaluation
-                from evaluator.answer_evaluator import evaluate_from_json_files
-                results = evaluate_from_json_files(converted_student_path, converted_answer_key_path)
+                # Run evaluation (cached on file contents across reruns)
+                results = evaluate_json_files_cached(converted_student_path, converted_answer_key_path)
                 
                 if results:
                     # Add student identifier to results
@@ -253,48 +253,27 @@ def process_question_generation(uploaded_file, questions_per_topic: int):
             
             # Run the pipeline (this is the blocking operation)
             try:
-                run_pipeline_web(temp_file_path, "temp_questions.json", questions_per_topic)
+                # The pipeline returns the questions it saved to the
+                # intermediate file, so they are not downloaded again
+                questions = run_pipeline_web(temp_file_path, "temp_questions.json", questions_per_topic)
                 
                 # Update status after pipeline completion
                 status_text.text("📝 Loading generated questions...")
                 details_text.text("Processing generated questions...")
                 
-                # Load the intermediate questions from Azure blob storage ONLY
-                intermediate_path_str = "answer_key_gen/intermediate_questions.json"
-                questions = None
-                
-                # Load from Azure blob storage ONLY
                 try:
-                    import sys
-                    project_root = Path(__file__).parent.parent.parent.parent
-                    if str(project_root) not in sys.path:
-                        sys.path.insert(0, str(project_root))
-                    from storage import get_storage_client
-                    storage = get_storage_client()
+                    # Ensure all questions default to approved (approved: True)
+                    for question in questions:
+                        question['approved'] = True
                     
-                    if not storage.is_blob_storage():
-                        st.error("❌ Blob storage is not configured. Please configure Azure storage.")
-                        return
+                    # Store in session state for manual review
+                    st.session_state.generated_questions = questions
                     
-                    if storage.exists(intermediate_path_str):
-                        questions = storage.read_json(intermediate_path_str)
-                        
-                        # Ensure all questions default to approved (approved: True)
-                        for question in questions:
-                            question['approved'] = True
-                        
-                        # Store in session state for manual review
-                        st.session_state.generated_questions = questions
-                        
-                        # Clear the loading container and show success
-                        progress_container.empty()
-                        
-                    else:
-                        progress_container.empty()
-                        st.error(f"❌ Could not find generated questions file in Azure blob storage: {intermediate_path_str}")
+                    # Clear the loading container and show success
+                    progress_container.empty()
                 except Exception as e:
                     progress_container.empty()
-                    st.error(f"❌ Error loading questions from Azure blob storage: {str(e)}")
+                    st.error(f"❌ Error loading generated questions: {str(e)}")
                     import traceback
                     with st.expander("🔍 Error Details", expanded=False):
                         st.code(traceback.format_exc())
@@ -69,12 +69,12 @@ def process_question_generation(uploaded_file, questions_per_topic: int):
             print(f"DEBUG: About to call run_pipeline_web function")
             
             try:
-                result = run_pipeline_web(
+                questions = run_pipeline_web(
                     input_path=temp_file_path,
                     output_file="temp_questions.json",
                     questions_per_topic=questions_per_topic
                 )
-                print(f"DEBUG: run_pipeline_web completed, result: {result}")
+                print(f"DEBUG: run_pipeline_web completed, {len(questions)} questions")
             except Exception as e:
                 print(f"DEBUG: Error calling run_pipeline_web: {e}")
                 st.error(f"❌ Error calling run_pipeline_web: {e}")
@@ -84,44 +84,30 @@ def process_question_generation(uploaded_file, questions_per_topic: int):
             status_text.text("📝 Loading questions for review...")
             progress_bar.progress(80)
             
-            # Load intermediate questions from Azure blob storage ONLY
-            intermediate_path_str = "answer_key_gen/intermediate_questions.json"
-            questions = None
-            
+            # The pipeline returned the questions it saved to the intermediate
+            # file, so they are used directly rather than downloaded again
             try:
-                from storage import get_storage_client
-                storage = get_storage_client()
+                # Ensure all questions default to pending (approved: False)
+                for question in questions:
+                    question['approved'] = False
+                
+                # Store in session state for manual review
+                st.session_state.generated_questions = questions
+                # Reset documents generated flag since new questions are available
+                st.session_state.documents_generated = False
+                
+                # Step 4: Complete
+                status_text.text("✅ Questions ready for review!")
+                progress_bar.progress(100)
                 
-                if not storage.is_blob_storage():
-                    st.error("❌ Blob storage is not configured. Please configure Azure storage.")
-                    return
+                st.success("🎉 Questions generated successfully!")
+                st.info("🔄 Redirecting to Manual Review page...")
                 
-                if storage.exists(intermediate_path_str):
-                    questions = storage.read_json(intermediate_path_str)
-                    
-                    # Ensure all questions default to pending (approved: False)
-                    for question in questions:
-                        question['approved'] = False
-                    
-                    # Store in session state for manual review
-                    st.session_state.generated_questions = questions
-                    # Reset documents generated flag since new questions are available
-                    st.session_state.documents_generated = False
-                    
-                    # Step 4: Complete
-                    status_text.text("✅ Questions ready for review!")
-                    progress_bar.progress(100)
-                    
-                    st.success("🎉 Questions generated successfully!")
-                    st.info("🔄 Redirecting to Manual Review page...")
-                    
-                    # Navigate to manual review page
-                    st.session_state.current_page = 'manual_review'
-                    st.rerun()
-                else:
-                    st.error(f"❌ Could not find generated questions file in Azure blob storage: {intermediate_path_str}")
+                # Navigate to manual review page
+                st.session_state.current_page = 'manual_review'
+                st.rerun()
             except Exception as e:
-                st.error(f"❌ Error loading questions from Azure blob storage: {str(e)}")
+                st.error(f"❌ Error loading generated questions: {str(e)}")
                 import traceback
                 with st.expander("🔍 Error Details", expanded=False):
                     st.code(traceback.format_exc())
@@ -1,13 +1,26 @@
 """UI Styles and CSS for Streamlit app"""
 import streamlit as st
 
-def load_custom_css():
-    """Load and apply custom CSS styles with dark theme"""
-    st.markdown("""
+# Whole app stylesheet (dark theme included), injected as a single <style> tag
+_CUSTOM_CSS = """
     <style>
         /* Import Google Fonts */
         @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
         
+        /* Dark app background */
+        [data-testid="stAppViewContainer"] {
+            background-color: #0e1117;
+            color: #fafafa;
+        }
+        
+        .stApp {
+            background-color: #0e1117;
+        }
+        
+        .main {
+            background-color: #0e1117;
+        }
+        
         /* Global dark theme styles */
         .main .block-container {
             padding-top: 2rem;
@@ -343,5 +356,8 @@ def load_custom_css():
             }
         }
     </style>
-    """, unsafe_allow_html=True)
+    """
 
+def load_custom_css():
+    """Load and apply custom CSS styles with dark theme"""
+    st.markdown(_CUSTOM_CSS, unsafe_allow_html=True)